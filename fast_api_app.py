@@ -1,11 +1,7 @@
 import logging
 import os
-import random
-import json
 import asyncio
-import base64
-from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Optional
 from uuid import uuid4
 
 from fastapi import (
@@ -15,19 +11,24 @@ from fastapi import (
     Form,
     HTTPException,
     BackgroundTasks,
-    Response,
 )
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
-import base64
 from pydantic import BaseModel
-from openai import OpenAI
 from fastapi import Request
 from dotenv import load_dotenv
 
-from src.utils.utils import add_feedback_to_state, get_all_timestamps
-from src.utils.textGDwithWeightClipping import optimize_prompt
-from src.paudio import create_podcast_audio
+from src.utils.utils import add_feedback_to_state, prompt_index, event_log, pdf_extraction_engine, PROJECT_ROOT
+from src.utils.textGDwithWeightClipping import optimize_prompts
+from src.paudio import create_podcast_audio, tts_segment_cache
+from src.utils.task_store import SQLiteTaskStore
+from src.utils.feedback_jobs import FeedbackJobQueue
+from src.utils.vote_store import SQLiteVoteStore
+from src.utils.client_pool import get_openai_client
+from src.utils.http_range import ranged_file_response
+from src.utils.progress import progress_broker, format_sse
+from src.utils.audio_streaming import audio_stream_registry
 
 # Set up logging
 logging.basicConfig(
@@ -53,7 +54,7 @@ def load_openai_api_key():
 
 try:
     openai_api_key = load_openai_api_key()
-    client = OpenAI(api_key=openai_api_key)
+    client = get_openai_client(openai_api_key)
 except ValueError as e:
     logger.error(str(e))
     print(str(e))
@@ -75,8 +76,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory task storage (replace with a proper database in production)
-tasks: Dict[str, Dict] = {}
+# Task storage shared by all workers; finished podcasts are kept as files next
+# to the database and expire after TASK_TTL_SECONDS.
+TASK_STORE_DIR = os.getenv("TASK_STORE_DIR", os.path.join(PROJECT_ROOT, "task_store"))
+TASK_TTL_SECONDS = int(os.getenv("TASK_TTL_SECONDS", 24 * 60 * 60))
+
+task_store = SQLiteTaskStore(
+    os.path.join(TASK_STORE_DIR, "tasks.db"),
+    os.path.join(TASK_STORE_DIR, "blobs"),
+    ttl_seconds=TASK_TTL_SECONDS,
+)
 
 
 class ApiKeyRequest(BaseModel):
@@ -91,28 +100,21 @@ class FeedbackRequest(BaseModel):
 
 class VoteRequest(BaseModel):
     timestamp: Optional[str] = None
+    task_id: Optional[str] = None
+    podcast_type: Optional[str] = None
 
 
 class ExperimentIdeaRequest(BaseModel):
     idea: str
 
 
-VOTES_FILE = "votes.json"
-EXPERIMENT_IDEAS_FILE = "experiment_ideas.md"
-
+VOTES_FILE = os.path.join(PROJECT_ROOT, "votes.json")
+SSE_KEEPALIVE_SECONDS = 15
 
-def load_votes():
-    if os.path.exists(VOTES_FILE):
-        with open(VOTES_FILE, "r") as f:
-            content = f.read().strip()
-            if content:
-                return json.loads(content)
-    return {}
-
-
-def save_votes(votes):
-    with open(VOTES_FILE, "w") as f:
-        json.dump(votes, f)
+# Votes are single atomic SQLite writes; totals from an old votes.json are
+# carried over the first time the store is opened.
+vote_store = SQLiteVoteStore(os.path.join(TASK_STORE_DIR, "votes.db"))
+vote_store.import_totals(VOTES_FILE)
 
 
 @app.get("/health")
@@ -120,6 +122,11 @@ async def health_check():
     return {"status": "OK"}
 
 
+@app.get("/tts_cache_stats")
+async def tts_cache_stats():
+    return tts_segment_cache.stats()
+
+
 @app.post("/create_podcasts")
 async def create_podcasts_endpoint(
     background_tasks: BackgroundTasks,
@@ -139,7 +146,12 @@ async def create_podcasts_endpoint(
         logger.info(f"PDF content read successfully. Size: {len(pdf_bytes)} bytes")
 
         task_id = str(uuid4())
-        tasks[task_id] = {"status": "processing", "result": None}
+        await asyncio.to_thread(
+            task_store.create, task_id, {"status": "processing", "result": None}
+        )
+        progress_broker.open(task_id)
+        for podcast_type in ("random", "last"):
+            audio_stream_registry.create(task_id, podcast_type)
 
         background_tasks.add_task(
             process_podcast_creation,
@@ -151,7 +163,13 @@ async def create_podcasts_endpoint(
             provider,
         )
 
-        return {"task_id": task_id}
+        return {
+            "task_id": task_id,
+            "stream_urls": {
+                podcast_type: f"/stream_podcast_audio/{task_id}/{podcast_type}"
+                for podcast_type in ("random", "last")
+            },
+        }
     except Exception as e:
         logger.error(f"Error in create_podcasts_endpoint: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -159,15 +177,67 @@ async def create_podcasts_endpoint(
 
 @app.get("/podcast_status/{task_id}")
 async def get_podcast_status(task_id: str):
-    task = tasks.get(task_id)
+    task = await asyncio.to_thread(task_store.get, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
 
 
+@app.get("/podcast_events/{task_id}")
+async def podcast_events(task_id: str):
+    """
+    Server-Sent Events stream of pipeline stages for a task.
+
+    Events are pushed as they happen while the task runs in this worker. When
+    the task runs in another worker (or already finished), the stream falls back
+    to reporting status changes from the task store.
+    """
+    if not await asyncio.to_thread(task_store.get, task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    async def event_stream():
+        history, queue = progress_broker.subscribe(task_id)
+        try:
+            for event in history:
+                yield format_sse(event)
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    if not progress_broker.is_open(task_id):
+                        event = None
+                    else:
+                        continue
+
+                if event is None:
+                    # Not (or no longer) running here: wait for the stored status to settle
+                    task = await asyncio.to_thread(task_store.get, task_id)
+                    if task and task["status"] == "processing":
+                        await asyncio.sleep(SSE_KEEPALIVE_SECONDS)
+                        queue.put_nowait(None)
+                        continue
+                    status = task["status"] if task else "failed"
+                    yield format_sse({"task_id": task_id, "stage": status})
+                    break
+
+                yield format_sse(event)
+                if event["stage"] in ("completed", "failed"):
+                    break
+        finally:
+            progress_broker.unsubscribe(task_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/get_podcast_audio/{task_id}/{podcast_type}")
-async def get_podcast_audio(task_id: str, podcast_type: str):
-    task = tasks.get(task_id)
+async def get_podcast_audio(request: Request, task_id: str, podcast_type: str):
+    task = await asyncio.to_thread(task_store.get, task_id)
     if not task or task["status"] != "completed":
         raise HTTPException(
             status_code=404, detail="Audio not found or task not completed"
@@ -181,9 +251,33 @@ async def get_podcast_audio(task_id: str, podcast_type: str):
             status_code=404, detail=f"Podcast of type {podcast_type} not found"
         )
 
-    audio_data = base64.b64decode(podcast["audio"])
+    audio_path = task_store.get_blob_path(task_id, podcast.get("audio_file") or "")
+    if not audio_path:
+        raise HTTPException(
+            status_code=404, detail=f"Audio for podcast of type {podcast_type} not found"
+        )
+
+    return ranged_file_response(request, audio_path, "audio/mpeg")
+
+
+@app.get("/stream_podcast_audio/{task_id}/{podcast_type}")
+async def stream_podcast_audio(request: Request, task_id: str, podcast_type: str):
+    """
+    Streams a podcast while it is still being synthesized.
 
-    return Response(content=audio_data, media_type="audio/mpeg")
+    MP3 chunks are sent in dialogue order as soon as each TTS segment is ready.
+    Once the task has finished (or when the job runs in another worker) this
+    serves the stored file like /get_podcast_audio.
+    """
+    stream = audio_stream_registry.get(task_id, podcast_type)
+    if stream is not None:
+        return StreamingResponse(
+            stream.iter_chunks(),
+            media_type="audio/mpeg",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    return await get_podcast_audio(request, task_id, podcast_type)
 
 
 async def process_podcast_creation(
@@ -200,39 +294,55 @@ async def process_podcast_creation(
             f"Using models - Summarizer: {summarizer_model}, Scriptwriter: {scriptwriter_model}, Enhancer: {enhancer_model}"
         )
 
-        all_timestamps = get_all_timestamps()
-        logger.info(f"All timestamps: {all_timestamps}")
-
-        last_timestamp = max(all_timestamps) if all_timestamps else None
-        other_timestamps = [t for t in all_timestamps if t != last_timestamp]
-        random_timestamp = random.choice(other_timestamps) if other_timestamps else None
+        last_timestamp = prompt_index.latest()
+        random_timestamp = prompt_index.random(exclude=last_timestamp)
+        logger.info(f"Using timestamps - last: {last_timestamp}, random: {random_timestamp}")
 
         async def create_podcast_subtask(timestamp, podcast_type):
+            def progress_callback(stage, **details):
+                progress_broker.publish(
+                    task_id, stage, podcast_type=podcast_type, **details
+                )
+
             try:
                 logger.info(f"Creating podcast for timestamp {timestamp}")
-                (
-                    podcast_audio,
-                    dialogue_text,
-                    new_timestamp,
-                ) = await create_podcast_audio(
-                    pdf_bytes,
-                    timestamp=timestamp,
-                    summarizer_model=summarizer_model,
-                    scriptwriter_model=scriptwriter_model,
-                    enhancer_model=enhancer_model,
-                    provider=provider,
-                )
+                # The audio is written into the task's blob file segment by
+                # segment, so the episode is never held in memory as a whole
+                audio_file = f"{podcast_type}.mp3"
+                with task_store.open_blob(task_id, audio_file) as audio_output:
+                    (
+                        audio_size,
+                        dialogue_text,
+                        new_timestamp,
+                    ) = await create_podcast_audio(
+                        pdf_bytes,
+                        timestamp=timestamp,
+                        summarizer_model=summarizer_model,
+                        scriptwriter_model=scriptwriter_model,
+                        enhancer_model=enhancer_model,
+                        provider=provider,
+                        progress_callback=progress_callback,
+                        audio_stream=audio_stream_registry.get(task_id, podcast_type),
+                        stream_enhancer=True,
+                        audio_output=audio_output,
+                    )
 
                 logger.info(f"Podcast created successfully for timestamp {timestamp}")
                 logger.info(f"New timestamp for saved podcast state: {new_timestamp}")
 
+                audio_url = None
+                if audio_size:
+                    audio_url = f"/get_podcast_audio/{task_id}/{podcast_type}"
+                else:
+                    audio_file = None
+
                 return {
                     "timestamp": timestamp,
                     "new_timestamp": new_timestamp,
                     "type": podcast_type,
-                    "audio": base64.b64encode(podcast_audio).decode("utf-8")
-                    if podcast_audio
-                    else None,
+                    "audio_file": audio_file,
+                    "audio_url": audio_url,
+                    "audio_size": audio_size,
                     "dialogue": dialogue_text,
                 }
             except Exception as e:
@@ -240,6 +350,9 @@ async def process_podcast_creation(
                     f"Error in create_podcast_subtask for timestamp {timestamp}: {str(e)}",
                     exc_info=True,
                 )
+                audio_stream = audio_stream_registry.get(task_id, podcast_type)
+                if audio_stream is not None:
+                    await audio_stream.fail(str(e))
                 return {"error": str(e), "timestamp": timestamp, "type": podcast_type}
 
         logger.info("Creating both podcasts concurrently")
@@ -254,17 +367,63 @@ async def process_podcast_creation(
             error_messages = "; ".join(
                 [f"{error['type']} podcast: {error['error']}" for error in errors]
             )
-            tasks[task_id] = {
-                "status": "failed",
-                "error": f"Failed to create podcasts: {error_messages}",
-            }
+            await asyncio.to_thread(
+                task_store.set,
+                task_id,
+                {
+                    "status": "failed",
+                    "error": f"Failed to create podcasts: {error_messages}",
+                },
+            )
+            progress_broker.publish(task_id, "failed")
         else:
             logger.info("Podcasts created successfully")
-            tasks[task_id] = {"status": "completed", "result": {"podcasts": podcasts}}
+            await asyncio.to_thread(
+                task_store.set,
+                task_id, {"status": "completed", "result": {"podcasts": podcasts}}
+            )
+            progress_broker.publish(task_id, "completed")
 
     except Exception as e:
         logger.error(f"Error in process_podcast_creation: {str(e)}", exc_info=True)
-        tasks[task_id] = {"status": "failed", "error": str(e)}
+        await asyncio.to_thread(
+            task_store.set, task_id, {"status": "failed", "error": str(e)}
+        )
+        progress_broker.publish(task_id, "failed")
+    finally:
+        progress_broker.close(task_id)
+        await audio_stream_registry.close(task_id)
+
+
+def run_feedback_round(feedback, old_timestamp, new_timestamp):
+    if old_timestamp:
+        add_feedback_to_state(old_timestamp, feedback)
+    optimize_prompts(old_timestamp, new_timestamp, "gpt-4o-mini", "gpt-4o-mini")
+
+
+# Prompt optimization runs in the background; feedback on the same podcast
+# arriving within FEEDBACK_COALESCE_SECONDS shares one round.
+feedback_jobs = FeedbackJobQueue(
+    run_feedback_round,
+    SQLiteTaskStore(
+        os.path.join(TASK_STORE_DIR, "feedback_jobs.db"),
+        None,
+        ttl_seconds=TASK_TTL_SECONDS,
+    ),
+    coalesce_seconds=float(os.getenv("FEEDBACK_COALESCE_SECONDS", 5)),
+)
+
+
+@app.on_event("startup")
+async def start_event_log():
+    await event_log.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_background_workers():
+    feedback_jobs.shutdown()
+    pdf_extraction_engine.shutdown()
+    await event_log.stop()
 
 
 @app.post("/process_feedback")
@@ -277,37 +436,43 @@ async def process_feedback(request: FeedbackRequest):
     logger.info(f"Old timestamp: {old_timestamp}")
     logger.info(f"New timestamp: {new_timestamp}")
 
-    if old_timestamp:
-        add_feedback_to_state(old_timestamp, feedback)
+    job = feedback_jobs.submit(feedback, old_timestamp, new_timestamp)
+    return {"message": "Feedback queued for prompt optimization", **job}
 
-    try:
-        optimize_prompt(
-            "summarizer", old_timestamp, new_timestamp, "gpt-4o-mini", "gpt-4o-mini"
-        )
-        optimize_prompt(
-            "scriptwriter", old_timestamp, new_timestamp, "gpt-4o-mini", "gpt-4o-mini"
-        )
-        optimize_prompt(
-            "enhancer", old_timestamp, new_timestamp, "gpt-4o-mini", "gpt-4o-mini"
-        )
-    except Exception as e:
-        logger.error(f"Error optimizing prompts: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500, detail=f"Error optimizing prompts: {str(e)}"
-        )
 
-    return {"message": "Feedback processed and prompts optimized"}
+@app.get("/feedback_status/{job_id}")
+async def get_feedback_status(job_id: str):
+    job = feedback_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @app.post("/vote")
 async def vote(request: VoteRequest):
-    votes = load_votes()
     timestamp = request.timestamp if request.timestamp is not None else "original"
-    if timestamp in votes:
-        votes[timestamp] += 1
-    else:
-        votes[timestamp] = 1
-    save_votes(votes)
+
+    # The pair of prompt versions that was shown, so votes can feed a rating model
+    shown = None
+    task = None
+    if request.task_id:
+        task = await asyncio.to_thread(task_store.get, request.task_id)
+    if task and task.get("result"):
+        shown = [
+            podcast.get("timestamp") or "original"
+            for podcast in task["result"]["podcasts"]
+        ]
+
+    await asyncio.to_thread(
+        vote_store.record_vote, timestamp, request.task_id, request.podcast_type, shown
+    )
+    event_log.log(
+        "vote",
+        timestamp=timestamp,
+        task_id=request.task_id,
+        podcast_type=request.podcast_type,
+        shown=shown,
+    )
     logger.info(f"Vote recorded for timestamp: {timestamp}")
     return {"message": "Vote recorded successfully", "timestamp": timestamp}
 
@@ -317,11 +482,7 @@ async def submit_experiment_idea(request: Request):
     idea = await request.body()
     idea_text = idea.decode("utf-8")
 
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(EXPERIMENT_IDEAS_FILE, "a") as f:
-        f.write(
-            f"\n\n---\n\nNew Experiment Idea (submitted on {timestamp}):\n\n{idea_text}\n"
-        )
+    event_log.log("experiment_idea", idea=idea_text)
 
     return {"message": "Experiment idea submitted successfully"}
 
@@ -38,6 +38,7 @@ function App() {
   const [error, setError] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
   const [newTimestamp, setNewTimestamp] = useState(null);
+  const [taskId, setTaskId] = useState(null);
   const [feedbackState, setFeedbackState] = useState(FEEDBACK_STATES.DISABLED);
   const [progress, setProgress] = useState('');
   const [pdfFile, setPdfFile] = useState(null);
@@ -81,7 +82,13 @@ function App() {
         pdfFile,
         (progressData) => {
           console.log('Progress update:', progressData);
-          setProgress(`Processing... ${progressData.status}`);
+          if (progressData.stage === 'tts_segment') {
+            setProgress(`Processing... ${progressData.podcast_type} podcast: audio segment ${progressData.segment}${progressData.total != null ? ` of ${progressData.total}` : ''}`);
+          } else if (progressData.stage) {
+            setProgress(`Processing... ${progressData.podcast_type ? `${progressData.podcast_type} podcast: ` : ''}${progressData.stage.replace(/_/g, ' ')}`);
+          } else {
+            setProgress(`Processing... ${progressData.status}`);
+          }
         }
       );
 
@@ -107,6 +114,7 @@ function App() {
           }
         });
 
+        setTaskId(result.taskId);
         if (lastPodcast?.new_timestamp) {
           setNewTimestamp(lastPodcast.new_timestamp);
         }
@@ -134,7 +142,7 @@ function App() {
     setSelectedPodcast(type);
     const timestamp = podcasts[type]?.timestamp;
     try {
-      const result = await submitVote(timestamp);
+      const result = await submitVote(timestamp, taskId, type);
       console.log("Vote submitted successfully:", result);
       setVoteState(VOTE_STATES.VOTED);
       localStorage.setItem('hasVoted', 'true');
@@ -24,47 +24,105 @@ export const createPodcasts = (pdfFile, onProgress) => {
     }).then(data => {
       const taskId = data.task_id;
       console.log('Podcast creation started, task ID:', taskId);
-      
-      const pollInterval = setInterval(async () => {
-        try {
-          const statusResponse = await fetch(`${API_BASE_URL}/podcast_status/${taskId}`);
-          if (!statusResponse.ok) {
-            throw new Error(`HTTP error! status: ${statusResponse.status}`);
+
+      const fetchResult = async () => {
+        const statusResponse = await fetch(`${API_BASE_URL}/podcast_status/${taskId}`);
+        if (!statusResponse.ok) {
+          throw new Error(`HTTP error! status: ${statusResponse.status}`);
+        }
+        const statusData = await statusResponse.json();
+        console.log('Podcast status:', statusData);
+
+        if (statusData.status === 'completed') {
+          // Fetch the audio data for both podcasts
+          const randomAudioResponse = await fetch(`${API_BASE_URL}/get_podcast_audio/${taskId}/random`);
+          const lastAudioResponse = await fetch(`${API_BASE_URL}/get_podcast_audio/${taskId}/last`);
+          
+          if (!randomAudioResponse.ok || !lastAudioResponse.ok) {
+            throw new Error(`HTTP error! status: ${randomAudioResponse.status} or ${lastAudioResponse.status}`);
           }
-          const statusData = await statusResponse.json();
-          console.log('Podcast status:', statusData);
+          
+          const randomAudioData = await randomAudioResponse.arrayBuffer();
+          const lastAudioData = await lastAudioResponse.arrayBuffer();
+          
+          // Add audio data to the result
+          statusData.result.podcasts = statusData.result.podcasts.map(podcast => ({
+            ...podcast,
+            audio_data: podcast.type === 'random' ? randomAudioData : lastAudioData
+          }));
+        }
+        return statusData;
+      };
 
-          if (statusData.status === 'completed') {
-            clearInterval(pollInterval);
-            // Fetch the audio data for both podcasts
-            const randomAudioResponse = await fetch(`${API_BASE_URL}/get_podcast_audio/${taskId}/random`);
-            const lastAudioResponse = await fetch(`${API_BASE_URL}/get_podcast_audio/${taskId}/last`);
-            
-            if (!randomAudioResponse.ok || !lastAudioResponse.ok) {
-              throw new Error(`HTTP error! status: ${randomAudioResponse.status} or ${lastAudioResponse.status}`);
+      const settle = (statusData) => {
+        if (statusData.status === 'completed') {
+          resolve({ ...statusData.result, taskId });
+          return true;
+        }
+        if (statusData.status === 'failed') {
+          reject(new Error(statusData.error || 'Podcast creation failed'));
+          return true;
+        }
+        return false;
+      };
+
+      const startPolling = () => {
+        const pollInterval = setInterval(async () => {
+          try {
+            const statusData = await fetchResult();
+            if (settle(statusData)) {
+              clearInterval(pollInterval);
+            } else if (onProgress) {
+              onProgress(statusData);
             }
-            
-            const randomAudioData = await randomAudioResponse.arrayBuffer();
-            const lastAudioData = await lastAudioResponse.arrayBuffer();
-            
-            // Add audio data to the result
-            statusData.result.podcasts = statusData.result.podcasts.map(podcast => ({
-              ...podcast,
-              audio_data: podcast.type === 'random' ? randomAudioData : lastAudioData
-            }));
-            resolve(statusData.result);
-          } else if (statusData.status === 'failed') {
+          } catch (error) {
+            console.error('Error polling podcast status:', error);
             clearInterval(pollInterval);
-            reject(new Error(statusData.error || 'Podcast creation failed'));
-          } else if (onProgress) {
-            onProgress(statusData);
+            reject(error);
           }
+        }, 5000); // Poll every 5 seconds
+      };
+
+      if (typeof EventSource === 'undefined') {
+        startPolling();
+        return;
+      }
+
+      // Stage events are pushed by the server; polling is only a fallback
+      const events = new EventSource(`${API_BASE_URL}/podcast_events/${taskId}`);
+      let finished = false;
+
+      const onStage = (event) => {
+        const stageData = JSON.parse(event.data);
+        if (onProgress) {
+          onProgress({ status: 'processing', ...stageData });
+        }
+      };
+      ['pdf_parsed', 'summarizer_done', 'scriptwriter_done', 'enhancer_done', 'tts_segment', 'audio_muxed']
+        .forEach(stage => events.addEventListener(stage, onStage));
+
+      const onFinished = async () => {
+        finished = true;
+        events.close();
+        try {
+          settle(await fetchResult());
         } catch (error) {
-          console.error('Error polling podcast status:', error);
-          clearInterval(pollInterval);
+          console.error('Error fetching podcast result:', error);
           reject(error);
         }
-      }, 5000); // Poll every 5 seconds
+      };
+      events.addEventListener('completed', onFinished);
+      events.addEventListener('failed', onFinished);
+
+      events.onerror = () => {
+        if (finished) {
+          return;
+        }
+        console.warn('Progress stream unavailable, falling back to polling');
+        finished = true;
+        events.close();
+        startPolling();
+      };
     }).catch(error => {
       console.error('Error in createPodcasts:', error);
       reject(error);
@@ -73,13 +131,17 @@ export const createPodcasts = (pdfFile, onProgress) => {
 };
 
 
-export const submitVote = async (timestamp) => {
+export const submitVote = async (timestamp, taskId, podcastType) => {
   const response = await fetch(`${API_BASE_URL}/vote`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
     },
-    body: JSON.stringify({ timestamp: timestamp === null ? "original" : timestamp }),
+    body: JSON.stringify({
+      timestamp: timestamp === null ? "original" : timestamp,
+      task_id: taskId || null,
+      podcast_type: podcastType || null
+    }),
   });
   if (!response.ok) {
     const errorData = await response.json();
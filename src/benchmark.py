@@ -0,0 +1,367 @@
+import os
+import asyncio
+import json
+import random
+import socket
+import statistics
+import threading
+import time
+from itertools import count
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Order of the pipeline milestones reported through progress_callback; the time
+# of a stage is measured from the previous milestone to its own.
+STAGE_MILESTONES = [
+    ("pdf", "pdf_parsed"),
+    ("summarizer", "summarizer_done"),
+    ("scriptwriter", "scriptwriter_done"),
+    ("enhancer", "enhancer_done"),
+    ("tts", "last_tts_segment"),
+    ("assembly", "audio_muxed"),
+]
+
+DEFAULT_CHAT_LATENCY = {"summarizer": 2.0, "scriptwriter": 1.5, "enhancer": 3.0}
+FILLER = (
+    "The paper proposes a method, evaluates it on several benchmarks and discusses "
+    "its limitations, trade-offs and possible extensions in some detail."
+)
+
+
+def make_silent_mp3(duration: float, sample_rate: int = 44100) -> bytes:
+    """
+    Returns `duration` seconds of silent 128 kbps mono MPEG-1 Layer III frames.
+    """
+    sample_rate_index = {44100: 0, 48000: 1, 32000: 2}[sample_rate]
+    header = bytes([0xFF, 0xFB, (9 << 4) | (sample_rate_index << 2), 0xC0])
+    frame_length = 144 * 128000 // sample_rate
+    frame = header + bytes(frame_length - len(header))
+    frames = max(1, round(duration * sample_rate / 1152))
+    return frame * frames
+
+
+class FakeOpenAIServer:
+    """
+    Local stand-in for the OpenAI chat completions and speech endpoints.
+
+    The stage of a chat call is taken from its model name ("bench-summarizer",
+    "bench-enhancer/7", ...), and each call sleeps for a log-normally
+    distributed time around that stage's median latency. Streaming requests
+    spread the same latency over the chunks. The enhancer answers with a
+    Host/Guest dialogue, and speech requests return canned MP3 bytes, so the
+    whole pipeline runs without network access or API costs.
+    """
+
+    def __init__(self, chat_latency: Dict[str, float], tts_latency: float, latency_sigma: float = 0.3,
+                 dialogue_turns: int = 12, segment_seconds: float = 2.0, mp3_bytes: Optional[bytes] = None,
+                 mixed_formats: bool = False):
+        self.chat_latency = chat_latency
+        self.tts_latency = tts_latency
+        self.latency_sigma = latency_sigma
+        self.dialogue_turns = dialogue_turns
+        self.host_audio = mp3_bytes or make_silent_mp3(segment_seconds)
+        # A different sample rate for the guest forces the re-encoding (pydub) path
+        self.guest_audio = make_silent_mp3(segment_seconds, 48000) if mixed_formats else self.host_audio
+        self._requests = count()
+        # Salts the fake dialogue so no two runs ever produce the same lines
+        self._run_id = uuid4().hex[:8]
+        self.app = self._create_app()
+        self.port = None
+        self._server = None
+
+    def _latency(self, median: float) -> float:
+        return random.lognormvariate(0, self.latency_sigma) * median if median > 0 else 0.0
+
+    def _completion_text(self, stage: str) -> str:
+        request_id = next(self._requests)
+        if stage == "enhancer":
+            # Distinct lines per request so the TTS segment cache does not absorb the load
+            return "\n".join(
+                f"{'Host' if turn % 2 == 0 else 'Guest'}: Turn {turn} of request {self._run_id}-{request_id}. {FILLER}"
+                for turn in range(self.dialogue_turns)
+            )
+        return f"{stage} output {request_id}. " + " ".join([FILLER] * 8)
+
+    def _create_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.post("/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            model = body.get("model", "")
+            stage = model.split("/")[0].replace("bench-", "")
+            latency = self._latency(self.chat_latency.get(stage, 1.0))
+            text = self._completion_text(stage)
+            created = int(time.time())
+
+            if not body.get("stream"):
+                await asyncio.sleep(latency)
+                return JSONResponse({
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+            words = text.split(" ")
+            chunk_size = 8
+
+            async def stream():
+                await asyncio.sleep(latency * 0.2)
+                chunks = [" ".join(words[i:i + chunk_size]) + " " for i in range(0, len(words), chunk_size)]
+                for chunk in chunks:
+                    await asyncio.sleep(latency * 0.8 / len(chunks))
+                    yield "data: " + json.dumps({
+                        "id": "chatcmpl-bench",
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}],
+                    }) + "\n\n"
+                yield "data: " + json.dumps({
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }) + "\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(stream(), media_type="text/event-stream")
+
+        @app.post("/v1/audio/speech")
+        async def speech(request: Request):
+            body = await request.json()
+            await asyncio.sleep(self._latency(self.tts_latency))
+            audio = self.host_audio if body.get("voice") == "onyx" else self.guest_audio
+            return Response(content=audio, media_type="audio/mpeg")
+
+        return app
+
+    def start(self) -> str:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        threading.Thread(target=self._server.run, daemon=True).start()
+        while not self._server.started:
+            time.sleep(0.05)
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def stage_durations(start: float, events: Dict[str, float]) -> Dict[str, float]:
+    durations = {}
+    previous = start
+    for stage, milestone in STAGE_MILESTONES:
+        if milestone in events:
+            durations[stage] = events[milestone] - previous
+            previous = events[milestone]
+    return durations
+
+
+async def run_level(create_podcast_audio, pdf_content: bytes, podcasts: int, concurrency: int, warm: bool, stream_enhancer: bool, run_offset: int) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, stages, failures = [], [], 0
+
+    async def run_one(i):
+        nonlocal failures
+        # Unless warm caches are requested, every podcast gets its own model
+        # names and PDF bytes, so the stage, PDF and TTS caches all miss
+        # and each run exercises the full pipeline.
+        suffix = "" if warm else f"/{run_offset + i}"
+        content = pdf_content if warm else pdf_content + f"\n%bench-{run_offset + i}\n".encode()
+        events = {}
+
+        def progress_callback(stage, **details):
+            now = time.perf_counter()
+            if stage == "tts_segment":
+                events["last_tts_segment"] = now
+            else:
+                events.setdefault(stage, now)
+
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await create_podcast_audio(
+                    content,
+                    summarizer_model=f"bench-summarizer{suffix}",
+                    scriptwriter_model=f"bench-scriptwriter{suffix}",
+                    enhancer_model=f"bench-enhancer{suffix}",
+                    provider="OpenAI",
+                    progress_callback=progress_callback,
+                    stream_enhancer=stream_enhancer,
+                )
+            except Exception as e:
+                print(f"Podcast {run_offset + i} failed: {e}")
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            stages.append(stage_durations(start, events))
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(run_one(i) for i in range(podcasts)))
+    wall_time = time.perf_counter() - wall_start
+
+    stage_means = {
+        stage: statistics.mean(durations[stage] for durations in stages if stage in durations)
+        for stage, _ in STAGE_MILESTONES
+        if any(stage in durations for durations in stages)
+    }
+    return {
+        "concurrency": concurrency,
+        "podcasts": podcasts,
+        "failures": failures,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "stage_means": stage_means,
+        "podcasts_per_minute": len(latencies) / wall_time * 60 if wall_time > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_report(results: List[Dict]) -> None:
+    stages = [stage for stage, _ in STAGE_MILESTONES]
+    print()
+    print(f"{'conc':>5} {'ok':>4} {'fail':>4} {'p50 s':>8} {'p95 s':>8} {'pod/min':>8} {'RSS MB':>8}  " + " ".join(f"{s[:8]:>8}" for s in stages))
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+        stage_cells = " ".join(f"{r['stage_means'][s]:8.2f}" if s in r["stage_means"] else f"{'-':>8}" for s in stages)
+        print(f"{r['concurrency']:>5} {r['podcasts'] - r['failures']:>4} {r['failures']:>4} {r['p50']:8.2f} {r['p95']:8.2f} "
+              f"{r['podcasts_per_minute']:8.1f} {rss:>8}  {stage_cells}")
+    print("\nStage columns are mean seconds per podcast (tts: enhancer done -> last segment, assembly: last segment -> muxed).")
+    print("Peak RSS is the process high-water mark, so it can only grow from one level to the next.")
+
+
+def parse_latencies(value: str) -> Dict[str, float]:
+    latencies = dict(DEFAULT_CHAT_LATENCY)
+    for item in filter(None, value.split(",")):
+        stage, seconds = item.split("=")
+        latencies[stage.strip()] = float(seconds)
+    return latencies
+
+
+def main():
+    import argparse
+    import shutil
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Benchmark the podcast pipeline against a local fake OpenAI server.")
+    parser.add_argument("--pdf", default=None, help="PDF to turn into podcasts (defaults to trace.pdf in the project root)")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--podcasts", type=int, default=None, help="Podcasts per level (default: 2x the concurrency, at least 4)")
+    parser.add_argument("--chat-latency", default="", help="Median seconds per chat stage, e.g. summarizer=2,scriptwriter=1.5,enhancer=3")
+    parser.add_argument("--tts-latency", type=float, default=0.8, help="Median seconds per speech request")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="Sigma of the log-normal latency distributions")
+    parser.add_argument("--turns", type=int, default=12, help="Dialogue turns (TTS segments) per podcast")
+    parser.add_argument("--segment-seconds", type=float, default=2.0, help="Length of each canned audio segment")
+    parser.add_argument("--mp3", default=None, help="MP3 file to return for every speech request instead of generated silence")
+    parser.add_argument("--mixed-formats", action="store_true", help="Return different sample rates per voice to exercise pydub re-encoding")
+    parser.add_argument("--stream-enhancer", action="store_true", help="Start TTS while the enhancer is still streaming")
+    parser.add_argument("--warm", action="store_true", help="Reuse model names and PDF bytes so the caches are hit")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    mp3_bytes = None
+    if args.mp3:
+        with open(args.mp3, "rb") as f:
+            mp3_bytes = f.read()
+    server = FakeOpenAIServer(
+        parse_latencies(args.chat_latency), args.tts_latency, args.latency_sigma,
+        dialogue_turns=args.turns, segment_seconds=args.segment_seconds, mp3_bytes=mp3_bytes,
+        mixed_formats=args.mixed_formats,
+    )
+    base_url = server.start()
+    print(f"Fake OpenAI server listening on {base_url}")
+
+    # The clients read these when they are created, and the TTS scheduler reads
+    # its limits at import time, so they must be set before importing the pipeline.
+    os.environ["OPENAI_API_KEY"] = "sk-bench"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_BASE"] = base_url
+    os.environ.setdefault("TTS_MAX_CONCURRENCY", "64")
+    os.environ.setdefault("TTS_REQUESTS_PER_MINUTE", "100000")
+
+    try:
+        from src import paudio
+        from src.utils import utils as pipeline
+        from src.utils.pdf_cache import PdfTextCache
+        from src.utils.script_cache import ScriptCache
+        from src.utils.tts_cache import TTSSegmentCache
+    except ImportError:
+        import paudio
+        from utils import utils as pipeline
+        from utils.pdf_cache import PdfTextCache
+        from utils.script_cache import ScriptCache
+        from utils.tts_cache import TTSSegmentCache
+
+    # Keep benchmark podcast states and cache entries out of the project's
+    # directories, so runs neither evict real entries nor start warm from an
+    # earlier run.
+    bench_dir = tempfile.mkdtemp(prefix="podcast_bench_")
+    states_dir = os.path.join(bench_dir, "podcast_states")
+    pipeline.podcast_state_store.states_dir = states_dir
+    pipeline.podcast_state_store.texts_dir = os.path.join(states_dir, "texts")
+    pipeline.pdf_text_cache = PdfTextCache(os.path.join(bench_dir, "pdf_cache"))
+    pipeline.script_cache = ScriptCache(os.path.join(bench_dir, "script_cache"))
+    paudio.tts_segment_cache = TTSSegmentCache(os.path.join(bench_dir, "tts_cache"))
+
+    with open(args.pdf or os.path.join(pipeline.PROJECT_ROOT, "trace.pdf"), "rb") as f:
+        pdf_content = f.read()
+
+    results = []
+    run_offset = int(time.time())
+    try:
+        for concurrency in (int(level) for level in args.concurrency.split(",")):
+            podcasts = args.podcasts or max(4, 2 * concurrency)
+            print(f"\nRunning {podcasts} podcasts at concurrency {concurrency}...")
+            results.append(asyncio.run(run_level(
+                paudio.create_podcast_audio, pdf_content, podcasts, concurrency, args.warm, args.stream_enhancer, run_offset,
+            )))
+            run_offset += podcasts
+    finally:
+        server.stop()
+        shutil.rmtree(bench_dir, ignore_errors=True)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,23 @@
 import os
 from dotenv import load_dotenv
-import random
+import asyncio
 import csv
+import json
+import re
+from collections import Counter
 from datetime import datetime
 import matplotlib
 matplotlib.use('Agg')  # Use a non-interactive backend
 import matplotlib.pyplot as plt
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Tuple, Optional
+from typing import Dict, Optional
 try:
-    from src.utils.utils import create_podcast, extract_text_from_pdf, get_random_arxiv_file, get_all_timestamps, PROJECT_ROOT
+    from src.utils.utils import create_podcast, extract_text_from_pdf_async, get_random_arxiv_file, prompt_index, PROJECT_ROOT
     from src.utils.agents_and_workflows import EvaluatorAgent
+    from src.utils.rating import RatingEngine, parse_verdict
 except ImportError:
-    from utils.utils import create_podcast, extract_text_from_pdf, get_random_arxiv_file, get_all_timestamps, PROJECT_ROOT
+    from utils.utils import create_podcast, extract_text_from_pdf_async, get_random_arxiv_file, prompt_index, PROJECT_ROOT
     from utils.agents_and_workflows import EvaluatorAgent
+    from utils.rating import RatingEngine, parse_verdict
 
 # Add the project root to sys.path
 import sys
@@ -21,33 +25,26 @@ sys.path.append(PROJECT_ROOT)
 
 load_dotenv()
 
-def choose_random_timestamps(n=2):
-    all_timestamps = get_all_timestamps()
-    if len(all_timestamps) < n:
-        print(f"Warning: Not enough timestamps available. Found {len(all_timestamps)}, need at least {n}.")
-        return all_timestamps if all_timestamps else [None, None]
-    return random.sample(all_timestamps, n)
+# Player name of the original prompts in prompts/ (timestamp None)
+ORIGINAL = "original"
 
-def update_scores(scores, winner):
-    if winner in scores:
-        scores[winner] += 1
-    else:
-        scores[winner] = 1
+def get_players():
+    return [ORIGINAL] + prompt_index.all_timestamps()
 
-def plot_scores(scores,  evaluator_model, prompt_model):
-    timestamps = sorted(scores.keys())
-    points = [scores[t] for t in timestamps]
-
-    # Normalize the points
-    total_points = sum(points)
-    normalized_points = [p / total_points for p in points] if total_points > 0 else points
+def plot_scores(engine: RatingEngine, evaluator_model, prompt_model):
+    timestamps = sorted(engine.players, key=lambda t: "" if t == ORIGINAL else t)
+    bt_ratings = engine.fit_bradley_terry()
+    bt_points = [bt_ratings[t] for t in timestamps]
+    elo_points = [engine.elo[t] for t in timestamps]
 
     plt.figure(figsize=(12, 6))
-    plt.plot(timestamps, normalized_points, marker='o')
-    plt.title("Normalized Prompt Performance Over Time")
+    plt.plot(timestamps, bt_points, marker='o', label="Bradley-Terry")
+    plt.plot(timestamps, elo_points, marker='x', linestyle='--', label="Elo")
+    plt.title("Prompt Rating Over Time")
     plt.xlabel("Timestamp")
-    plt.ylabel("Normalized Points")
+    plt.ylabel("Rating (Elo scale)")
     plt.xticks(rotation=45)
+    plt.legend(loc='lower right')
     
     # Add evaluator, prompt model, and provider information
     info_text = f"Evaluator: {evaluator_model}\nPrompt: {prompt_model}"
@@ -73,46 +70,147 @@ def plot_scores(scores,  evaluator_model, prompt_model):
     csv_filename = os.path.join(plots_dir, f"raw_data_{current_time}.csv")
     with open(csv_filename, 'w', newline='') as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow(['Timestamp', 'Raw Points', 'Normalized Points'])
-        for t, p, np in zip(timestamps, points, normalized_points):
-            writer.writerow([t, p, np])
+        writer.writerow(['Timestamp', 'Bradley-Terry Rating', 'Elo Rating', 'Matches'])
+        for t, bt, elo in zip(timestamps, bt_points, elo_points):
+            writer.writerow([t, round(bt, 1), round(elo, 1), int(engine.games_played(t))])
     
     print(f"Raw data saved as: {csv_filename}")
 
-def process_evaluation(evaluator, prompt_model, prompt_provider, i) -> Tuple[Optional[str], Optional[str], Optional[str]]:
-    print(f"{i}-th generation")
+def get_journal_path(evaluator_model, prompt_model, run_name=None):
+    journal_dir = os.path.join(PROJECT_ROOT, "evaluation_runs")
+    os.makedirs(journal_dir, exist_ok=True)
+    run_name = run_name or f"{evaluator_model}__{prompt_model}"
+    return os.path.join(journal_dir, re.sub(r"[^\w.-]+", "_", run_name) + ".jsonl")
+
+def load_journal(journal_path) -> Dict[int, dict]:
+    """
+    Returns the matches completed so far, keyed by match number. A line cut
+    short by an interrupted run is ignored, so that match is simply replayed.
+    """
+    matches = {}
+    if not os.path.exists(journal_path):
+        return matches
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            matches[record["match"]] = record
+    return matches
+
+def read_pdf(pdf_path) -> bytes:
+    with open(pdf_path, 'rb') as pdf_file:
+        return pdf_file.read()
+
+async def process_evaluation(evaluator, prompt_model, prompt_provider, i, player1, player2) -> Optional[dict]:
+    print(f"{i}-th generation: {player1} vs {player2}")
     pdf_path = get_random_arxiv_file()
     if pdf_path is None:
         print("No more PDF files available in the arxiv_folder. Stopping the evaluation process.")
-        return None, None, None
+        return None
     
     try:
-        original_text, token_count = extract_text_from_pdf(pdf_path)
+        # Read the bytes once; text extraction is cached by content hash, so the
+        # create_podcast calls below reuse the text parsed here.
+        pdf_content = await asyncio.to_thread(read_pdf, pdf_path)
+
+        original_text, token_count = await extract_text_from_pdf_async(pdf_content)
         if original_text is None:
             print(f"Failed to extract text from PDF: {pdf_path}")
-            return None, None, None
+            return None
 
-        timestamp1, timestamp2 = choose_random_timestamps(2)
+        timestamp1, timestamp2 = (None if p == ORIGINAL else p for p in (player1, player2))
         
-        podcast1, message1 = create_podcast(pdf_path, timestamp=timestamp1, summarizer_model=prompt_model, scriptwriter_model=prompt_model, enhancer_model=prompt_model, provider=prompt_provider, api_key=os.getenv("OPENAI_API_KEY"))
+        api_key = os.getenv("OPENAI_API_KEY") if prompt_provider == "OpenAI" else os.getenv("OPENROUTER_API_KEY")
+        # Both podcasts of the pair are generated at the same time
+        (podcast1, message1), (podcast2, message2) = await asyncio.gather(*(
+            create_podcast(pdf_content, timestamp=timestamp, summarizer_model=prompt_model, scriptwriter_model=prompt_model, enhancer_model=prompt_model, provider=prompt_provider, api_key=api_key, use_script_cache=True)
+            for timestamp in (timestamp1, timestamp2)
+        ))
         if podcast1 is None or message1 != "Success":
             print(f"Failed to create podcast1: {message1}")
-            return None, None, None
-        
-        api_key = os.getenv("OPENAI_API_KEY") if prompt_provider == "OpenAI" else os.getenv("OPENROUTER_API_KEY")
-        podcast2, message2 = create_podcast(pdf_path, timestamp=timestamp2, summarizer_model=prompt_model, scriptwriter_model=prompt_model, enhancer_model=prompt_model, provider=prompt_provider, api_key=api_key)
+            return None
         if podcast2 is None or message2 != "Success":
             print(f"Failed to create podcast2: {message2}")
-            return None, None, None
+            return None
         
-        evaluation = evaluator.evaluate_podcasts(original_text, podcast1["enhanced_script"].content, podcast2["enhanced_script"].content)
+        evaluation = await asyncio.to_thread(evaluator.evaluate_podcasts, original_text, podcast1["enhanced_script"].content, podcast2["enhanced_script"].content)
         
-        return timestamp1, timestamp2, evaluation
+        score1 = parse_verdict(evaluation)
+        if score1 is None:
+            print(f"Unclear response from evaluator: {evaluation}")
+        
+        return {
+            "match": i,
+            "pdf": os.path.basename(pdf_path),
+            "player1": player1,
+            "player2": player2,
+            "evaluation": evaluation,
+            "score1": score1,
+            "completed_at": datetime.now().isoformat(),
+        }
     except Exception as e:
         print(f"An error occurred: {str(e)}. Skipping this evaluation.")
-        return None, None, None
+        return None
+
+def record_match(engine: RatingEngine, record) -> None:
+    if record["score1"] is not None:
+        engine.record(record["player1"], record["player2"], record["score1"])
+
+async def run_tournament(evaluator, prompt_model, prompt_provider, num_matches, concurrency, journal_path) -> RatingEngine:
+    """
+    Plays matches 0..num_matches-1 on one event loop, at most `concurrency` at
+    a time. Each match's pair is chosen by the rating engine's active sampling
+    when it starts, and ratings are updated as soon as it finishes. Finished
+    matches are appended to the journal, so rerunning with the same journal
+    replays them into the ratings and only plays the ones still missing
+    (failed matches are retried).
+    """
+    engine = RatingEngine(get_players())
+    matches = load_journal(journal_path)
+    for record in matches.values():
+        record_match(engine, record)
+    if len(engine.players) < 2:
+        print("At least two prompt versions are needed for a tournament.")
+        return engine
+
+    pending = [i for i in range(num_matches) if i not in matches]
+    print(f"{len(matches)} matches already in {journal_path}, {len(pending)} to play.")
+
+    # Matches being played count as games already, so concurrent workers spread
+    # over different pairs instead of all picking the same uncertain one
+    in_flight = Counter()
+
+    with open(journal_path, 'a', encoding='utf-8') as journal:
+        async def worker():
+            while pending:
+                i = pending.pop(0)
+                player1, player2 = engine.next_pair(in_flight=in_flight)
+                pair = frozenset((player1, player2))
+                in_flight[pair] += 1
+                try:
+                    record = await process_evaluation(evaluator, prompt_model, prompt_provider, i, player1, player2)
+                finally:
+                    in_flight[pair] -= 1
+                if record is None:
+                    continue
+                journal.write(json.dumps(record) + "\n")
+                journal.flush()
+                record_match(engine, record)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return engine
 
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a pairwise evaluation tournament between prompt versions.")
+    parser.add_argument("--matches", type=int, default=10, help="Total number of pairwise matches in the run")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum number of matches played at the same time")
+    parser.add_argument("--run-name", help="Journal name; reuse it to resume an interrupted run")
+    args = parser.parse_args()
+
     evaluator_models = [ ("OpenAI", "gpt-4o-mini")]
     prompt_models = [ ("OpenAI", "gpt-4o-mini")]
     #evaluator_models = [("OpenRouter", "google/gemini-pro-1.5")]
@@ -124,39 +222,16 @@ def main():
 
     for evaluator_provider, evaluator_model in evaluator_models:
         for prompt_provider, prompt_model in prompt_models:
-            scores = {}
             evaluator = EvaluatorAgent(model=evaluator_model, provider=evaluator_provider)
+            journal_path = get_journal_path(evaluator_model, prompt_model, args.run_name)
+
+            engine = asyncio.run(run_tournament(evaluator, prompt_model, prompt_provider, args.matches, args.concurrency, journal_path))
+            if not engine.wins.any():
+                print("No evaluations were completed successfully or no PDF files were available. Stopping the process.")
+                break
 
-            with ThreadPoolExecutor(max_workers=10) as executor:
-                # Submit all tasks
-                futures = [executor.submit(process_evaluation, evaluator, prompt_model, prompt_provider, i) for i in range(1)]
-                
-                # Process results as they complete
-                all_none = True
-                for future in as_completed(futures):
-                    timestamp1, timestamp2, evaluation = future.result()
-                    if timestamp1 is None and timestamp2 is None and evaluation is None:
-                        continue
-                    all_none = False
-                    if evaluation:
-                        if "1" in evaluation.lower() and "2" not in evaluation.lower():
-                            update_scores(scores, timestamp1)
-                        elif "2" in evaluation.lower() and "1" not in evaluation.lower():
-                            update_scores(scores, timestamp2)
-                        else:
-                            print(f"Unclear or tie response from evaluator: {evaluation}")
-                    else:
-                        print("No evaluation result available.")
-
-                if all_none:
-                    print("All evaluations failed or no PDF files were available. Stopping the process.")
-                    break
-
-                if scores:  # Only plot if we have any scores
-                    plot_scores(scores, evaluator_model, prompt_model)
-                    print(f"Evaluation complete for evaluator: {evaluator_model}, prompt: {prompt_model}. Results plotted.")
-                else:
-                    print("No evaluations were completed successfully. No results to plot.")
+            plot_scores(engine, evaluator_model, prompt_model)
+            print(f"Evaluation complete for evaluator: {evaluator_model}, prompt: {prompt_model}. Results plotted.")
 
 if __name__ == "__main__":
     main()
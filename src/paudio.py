@@ -2,19 +2,33 @@ import os
 import asyncio
 import io
 from datetime import datetime
-from openai import OpenAI
 import logging
 from pydub import AudioSegment
 try:
-    from src.utils.utils import create_podcast, parse_dialogue, save_podcast_state, PROJECT_ROOT, get_last_timestamp
+    from src.utils.utils import create_podcast, parse_dialogue, save_podcast_state, PROJECT_ROOT, get_last_timestamp, DialogueStreamParser
+    from src.utils.progress import report_progress
+    from src.utils.tts_scheduler import tts_scheduler
+    from src.utils.tts_cache import TTSSegmentCache
+    from src.utils.audio_assembly import Mp3Assembler, Mp3FormatMismatch
+    from src.utils.client_pool import get_openai_client
 except ImportError:
-    from utils.utils import create_podcast, parse_dialogue, save_podcast_state, PROJECT_ROOT, get_last_timestamp
-import threading
+    from utils.utils import create_podcast, parse_dialogue, save_podcast_state, PROJECT_ROOT, get_last_timestamp, DialogueStreamParser
+    from utils.progress import report_progress
+    from utils.tts_scheduler import tts_scheduler
+    from utils.tts_cache import TTSSegmentCache
+    from utils.audio_assembly import Mp3Assembler, Mp3FormatMismatch
+    from utils.client_pool import get_openai_client
+from uuid import uuid4
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+TTS_MODEL = "tts-1"
+
+# Synthesized lines are reused across podcasts; only cache misses reach the API
+tts_segment_cache = TTSSegmentCache(os.path.join(PROJECT_ROOT, "tts_cache"))
+
 def generate_tts(text, voice="onyx"):
     """
     Generates text-to-speech audio using OpenAI's API.
@@ -27,9 +41,9 @@ def generate_tts(text, voice="onyx"):
     bytes: The generated audio content.
     """
     try:
-        client = OpenAI()
+        client = get_openai_client()
         response = client.audio.speech.create(
-            model="tts-1",
+            model=TTS_MODEL,
             voice=voice,
             input=text
         )
@@ -39,45 +53,102 @@ def generate_tts(text, voice="onyx"):
         logger.error(f"Error in OpenAI TTS API call: {str(e)}", exc_info=True)
         raise
 
-# Create a thread-local storage for OpenAI clients
-thread_local = threading.local()
-
-def get_openai_client():
-    if not hasattr(thread_local, "openai_client"):
-        thread_local.openai_client = OpenAI()
-    return thread_local.openai_client
-
-async def generate_tts_async(text, voice="onyx"):
+async def generate_tts_async(text, voice="onyx", job_id="default"):
     """
     Asynchronously generates text-to-speech audio using OpenAI's API.
 
+    Calls go through the shared TTS scheduler, which bounds concurrency across
+    all podcasts, rate-limits requests and retries on 429s.
+
     Args:
     text (str): The text to convert to speech.
     voice (str, optional): The voice to use for TTS. Defaults to "onyx".
+    job_id (str, optional): Identifies the podcast the line belongs to, for fair scheduling.
 
     Returns:
     bytes: The generated audio content.
     """
     try:
-        client = get_openai_client()
-        loop = asyncio.get_running_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: client.audio.speech.create(
-                model="tts-1",
-                voice=voice,
-                input=text
-            )
-        )
+        audio_content = await tts_scheduler.synthesize(text, voice=voice, model=TTS_MODEL, job_id=job_id)
         logger.info(f"TTS audio generated asynchronously using voice: {voice}")
-        return response.content
+        return audio_content
     except Exception as e:
         logger.error(f"Error in asynchronous OpenAI TTS API call: {str(e)}", exc_info=True)
         raise
 
-async def create_podcast_audio(pdf_content, timestamp=None, summarizer_model="gpt-4o-mini", scriptwriter_model="gpt-4o-mini", enhancer_model="gpt-4o-mini", provider="OpenAI", api_key=None):
+def reencode_audio_segments(audio_contents):
+    """
+    Decodes and re-encodes the segments with pydub. Only used when the segments
+    do not share one MP3 format and cannot simply be concatenated.
+    """
+    segments = [AudioSegment.from_mp3(io.BytesIO(audio_content)) for audio_content in audio_contents]
+    if segments:
+        # Match the first segment's format, then join the PCM once instead of += in a loop
+        sample_rate, channels, sample_width = segments[0].frame_rate, segments[0].channels, segments[0].sample_width
+        segments = [
+            segment.set_frame_rate(sample_rate).set_channels(channels).set_sample_width(sample_width)
+            for segment in segments
+        ]
+        combined_audio = segments[0]._spawn(b"".join(segment.raw_data for segment in segments))
+    else:
+        combined_audio = AudioSegment.empty()
+
+    buffer = io.BytesIO()
+    combined_audio.export(buffer, format="mp3")
+    return buffer.getvalue()
+
+async def write_podcast_audio(segment_tasks, output) -> int:
+    """
+    Writes the segments to `output` in dialogue order as each one finishes,
+    copying their MP3 frames without decoding, and releases every segment once
+    it is written. If a segment's format differs from the others, what was
+    written so far is read back and everything from there on is re-encoded.
+    Returns the number of bytes written.
+    """
+    assembler = Mp3Assembler(output)
+    start = output.tell()
+    fallback_segments = None
+    try:
+        for index in range(len(segment_tasks)):
+            audio_content, speaker = await segment_tasks[index]
+            # Drop the finished task so its segment can be freed once written
+            segment_tasks[index] = None
+            if fallback_segments is not None:
+                fallback_segments.append(audio_content)
+                continue
+            position = output.tell()
+            try:
+                await asyncio.to_thread(assembler.append, audio_content)
+            except Mp3FormatMismatch as e:
+                logger.warning(f"Falling back to re-encoding the podcast audio: {e}")
+                output.seek(start)
+                written = output.read(position - start)
+                output.seek(start)
+                output.truncate()
+                fallback_segments = [written, audio_content] if written else [audio_content]
+    except BaseException:
+        for task in segment_tasks:
+            if task is not None:
+                task.cancel()
+        raise
+
+    if fallback_segments is not None:
+        audio_bytes = await asyncio.to_thread(reencode_audio_segments, fallback_segments)
+        await asyncio.to_thread(output.write, audio_bytes)
+    return output.tell() - start
+
+async def create_podcast_audio(pdf_content, timestamp=None, summarizer_model="gpt-4o-mini", scriptwriter_model="gpt-4o-mini", enhancer_model="gpt-4o-mini", provider="OpenAI", api_key=None, progress_callback=None, audio_stream=None, summarizer_mode="auto", stream_enhancer=False, audio_output=None):
     """
     Creates an audio podcast from the given PDF content using the provided timestamp and models.
+
+    If given, progress_callback(stage, **details) is called as the pipeline advances
+    (pdf_parsed, summarizer_done, scriptwriter_done, enhancer_done, tts_segment, audio_muxed).
+    If given, audio_stream (a SegmentStream) receives every TTS segment as soon as it is
+    synthesized, so listeners can start playback before the whole episode is ready.
+    With stream_enhancer, TTS starts on each dialogue turn as soon as the enhancer has
+    finished generating it, overlapping script generation and speech synthesis.
+    With audio_output (a seekable binary file), the episode is written into it as the
+    segments complete and the number of bytes written is returned instead of the audio.
     """
     if timestamp == "last":
         timestamp = get_last_timestamp()
@@ -88,7 +159,42 @@ async def create_podcast_audio(pdf_content, timestamp=None, summarizer_model="gp
         print("Using default prompts")
     
     print(f"Using models - Summarizer: {summarizer_model}, Scriptwriter: {scriptwriter_model}, Enhancer: {enhancer_model}")
-    
+
+    # Generate audio for each dialogue piece concurrently; the scheduler
+    # decides how many of them actually hit the API at once.
+    job_id = str(uuid4())
+    dialogue_pieces = []
+    segment_tasks = []
+    total_segments = None
+    completed_segments = 0
+
+    async def generate_audio_segment(index, piece):
+        nonlocal completed_segments
+        speaker, text = piece.split(': ', 1)
+        voice = "onyx" if speaker == "Host" else "nova"
+        # The cache reads and writes whole MP3 blobs, so keep it off the event loop
+        audio_content = await asyncio.to_thread(tts_segment_cache.get, voice, TTS_MODEL, text)
+        if audio_content is None:
+            audio_content = await generate_tts_async(text, voice=voice, job_id=job_id)
+            await asyncio.to_thread(tts_segment_cache.set, voice, TTS_MODEL, text, audio_content)
+        if audio_stream is not None:
+            await audio_stream.put(index, audio_content)
+        completed_segments += 1
+        # While the enhancer is still streaming the number of segments is not known yet
+        totals = {"total": total_segments} if total_segments is not None else {}
+        report_progress(progress_callback, "tts_segment", segment=completed_segments, **totals)
+        return audio_content, speaker
+
+    def schedule_segments(pieces):
+        for piece in pieces:
+            segment_tasks.append(asyncio.create_task(generate_audio_segment(len(dialogue_pieces), piece)))
+            dialogue_pieces.append(piece)
+
+    dialogue_parser = DialogueStreamParser()
+
+    def on_enhancer_token(token):
+        schedule_segments(dialogue_parser.feed(token))
+
     # Create the podcast
     podcast_state, message = await create_podcast(
         pdf_content, 
@@ -97,10 +203,15 @@ async def create_podcast_audio(pdf_content, timestamp=None, summarizer_model="gp
         scriptwriter_model=scriptwriter_model, 
         enhancer_model=enhancer_model, 
         provider=provider, 
-        api_key=api_key
+        api_key=api_key,
+        progress_callback=progress_callback,
+        summarizer_mode=summarizer_mode,
+        enhancer_token_callback=on_enhancer_token if stream_enhancer else None
     )
     
     if podcast_state is None or message != "Success":
+        for task in segment_tasks:
+            task.cancel()
         raise ValueError(f"Failed to create podcast state: {message}")
     
     # Generate a new timestamp for saving the podcast state
@@ -112,33 +223,27 @@ async def create_podcast_audio(pdf_content, timestamp=None, summarizer_model="gp
     if not enhanced_script:
         raise ValueError("No enhanced script found in the podcast state")
 
-    # Parse the dialogue
-    dialogue_pieces = parse_dialogue(enhanced_script)
-
-    # Generate audio for each dialogue piece concurrently
-    async def generate_audio_segment(piece):
-        speaker, text = piece.split(': ', 1)
-        voice = "onyx" if speaker == "Host" else "nova"
-        audio_content = await generate_tts_async(text, voice=voice)
-        return audio_content, speaker
-
-    audio_segments = await asyncio.gather(*[generate_audio_segment(piece) for piece in dialogue_pieces])
-
-    # Combine audio segments
-    combined_audio = AudioSegment.empty()
-    for audio_content, speaker in audio_segments:
-        segment = AudioSegment.from_mp3(io.BytesIO(audio_content))
-        combined_audio += segment
+    # Parse the dialogue (or what is left of it when the enhancer was streamed)
+    if stream_enhancer:
+        schedule_segments(dialogue_parser.finish())
+    else:
+        schedule_segments(parse_dialogue(enhanced_script))
+    total_segments = len(dialogue_pieces)
+    if audio_stream is not None:
+        await audio_stream.set_total(total_segments)
 
-    # Export the final podcast audio to bytes
-    buffer = io.BytesIO()
-    combined_audio.export(buffer, format="mp3")
-    audio_bytes = buffer.getvalue()
+    # Combine audio segments by copying their MP3 frames, without decoding
+    output = audio_output if audio_output is not None else io.BytesIO()
+    audio_size = await write_podcast_audio(segment_tasks, output)
+    report_progress(progress_callback, "audio_muxed", size=audio_size)
+    logger.info(f"TTS segment cache: {tts_segment_cache.stats()}")
 
     # Save the dialogue
     dialogue_text = "\n".join(dialogue_pieces)
 
-    return audio_bytes, dialogue_text, new_timestamp
+    if audio_output is not None:
+        return audio_size, dialogue_text, new_timestamp
+    return output.getvalue(), dialogue_text, new_timestamp
 
 if __name__ == "__main__":
     import argparse
@@ -4,11 +4,11 @@ from datetime import datetime
 try:
     from src.paudio import create_podcast_audio
     from src.utils.utils import get_last_timestamp, add_feedback_to_state, PROJECT_ROOT
-    from src.utils.textGDwithWeightClipping import optimize_prompt
+    from src.utils.textGDwithWeightClipping import optimize_prompts
 except ImportError:
     from paudio import create_podcast_audio
     from utils.utils import get_last_timestamp, add_feedback_to_state, PROJECT_ROOT
-    from utils.textGDwithWeightClipping import optimize_prompt
+    from utils.textGDwithWeightClipping import optimize_prompts
 
 async def create_podcast_with_feedback(pdf_path, timestamp=None):
     # Get the last timestamp if not provided or if 'last' is specified
@@ -61,9 +61,7 @@ async def create_podcast_with_feedback(pdf_path, timestamp=None):
         
         # Optimize prompts
         print("\nOptimizing prompts based on feedback...")
-        optimize_prompt("summarizer", timestamp, new_timestamp, "gpt-4o", "gpt-4o")
-        optimize_prompt("scriptwriter", timestamp, new_timestamp, "gpt-4o", "gpt-4o")
-        optimize_prompt("enhancer", timestamp, new_timestamp, "gpt-4o", "gpt-4o")
+        optimize_prompts(timestamp, new_timestamp, "gpt-4o", "gpt-4o")
         print("Prompts optimized successfully.")
     else:
         print("No feedback provided. Prompts will not be optimized.")
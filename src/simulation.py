@@ -5,11 +5,11 @@ from datetime import datetime
 try:
     from src.utils.utils import create_podcast, parse_dialogue, save_podcast_state, add_feedback_to_state, get_random_arxiv_file, get_last_timestamp, PROJECT_ROOT
     from src.utils.agents_and_workflows import FeedbackAgent, PersonalityCreatorAgent
-    from src.utils.textGDwithWeightClipping import optimize_prompt
+    from src.utils.textGDwithWeightClipping import optimize_prompts
 except ImportError:
     from utils.utils import create_podcast, parse_dialogue, save_podcast_state, add_feedback_to_state, get_random_arxiv_file, get_last_timestamp, PROJECT_ROOT
     from utils.agents_and_workflows import FeedbackAgent, PersonalityCreatorAgent
-    from utils.textGDwithWeightClipping import optimize_prompt
+    from utils.textGDwithWeightClipping import optimize_prompts
 
 # Predefined values for provider and models
 podcast_provider = "OpenAI"
@@ -74,9 +74,7 @@ def process_pdf_and_improve_prompts():
     print(f"\nParsed Dialogue Pieces saved to: {dialogue_file}")
 
     # Optimize prompts
-    optimize_prompt("summarizer", last_timestamp, new_timestamp, "gpt-4o-mini", "gpt-4o-mini")
-    optimize_prompt("scriptwriter", last_timestamp, new_timestamp, "gpt-4o-mini", "gpt-4o-mini")
-    optimize_prompt("enhancer", last_timestamp, new_timestamp, "gpt-4o-mini", "gpt-4o-mini")
+    optimize_prompts(last_timestamp, new_timestamp, "gpt-4o-mini", "gpt-4o-mini")
 
     return True
 
@@ -1,15 +1,36 @@
-import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from os import path
 from langgraph.graph import END, StateGraph
 from langchain_core.messages import BaseMessage, HumanMessage
 from typing import TypedDict
 from dotenv import load_dotenv
-import os
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+try:
+    from src.utils.progress import report_progress
+    from src.utils.stage_cache import stage_cache, make_stage_key
+    from src.utils.text_chunking import count_tokens, split_text_into_chunks
+    from src.utils.client_pool import get_chat_model
+    from src.utils.prompt_store import prompt_cache
+except ImportError:
+    from utils.progress import report_progress
+    from utils.stage_cache import stage_cache, make_stage_key
+    from utils.text_chunking import count_tokens, split_text_into_chunks
+    from utils.client_pool import get_chat_model
+    from utils.prompt_store import prompt_cache
 
 load_dotenv()
 
+# Human message for the reduce step of the map-reduce summarizer; the system
+# prompt stays the (optimizable) summarizer prompt.
+SUMMARIZER_REDUCE_TEMPLATE = """The following are key points extracted separately from {num_chunks} consecutive parts of the same academic text, in order.
+Merge them into a single, coherent set of key points for the whole text: remove duplicates, keep the original order of ideas and preserve every important detail.
+
+{partial_key_points}"""
+
+# Texts up to this many tokens are summarized in a single request in "auto" mode
+SINGLE_PASS_TOKEN_LIMIT = 40000
+
 class PodcastState(TypedDict):
     main_text: BaseMessage
     key_points: BaseMessage
@@ -17,148 +38,211 @@ class PodcastState(TypedDict):
     enhanced_script: BaseMessage
 
 class PodcastCreationWorkflow:
-    def __init__(self, summarizer_model="openai/gpt-4o-mini", scriptwriter_model="openai/gpt-4o-mini", enhancer_model="openai/gpt-4o-mini", timestamp=None, provider="OpenRouter", api_key=None):
+    def __init__(self, summarizer_model="openai/gpt-4o-mini", scriptwriter_model="openai/gpt-4o-mini", enhancer_model="openai/gpt-4o-mini", timestamp=None, provider="OpenRouter", api_key=None, progress_callback=None, summarizer_mode="auto", map_reduce_chunk_tokens=8000, enhancer_token_callback=None, auto_map_reduce_tokens=SINGLE_PASS_TOKEN_LIMIT, max_parallel_chunks=8):
         self.provider = provider
         self.api_key = api_key
+        self.progress_callback = progress_callback
+        # "single" sends the whole text in one request, "map_reduce" always
+        # summarizes chunks and merges them, "auto" does so only for texts
+        # longer than auto_map_reduce_tokens.
+        self.summarizer_mode = summarizer_mode
+        self.map_reduce_chunk_tokens = map_reduce_chunk_tokens
+        self.auto_map_reduce_tokens = auto_map_reduce_tokens
+        # At most this many chunk summaries are requested at the same time
+        self.max_parallel_chunks = max_parallel_chunks
+        # When set, the async enhancer streams its output and calls this with
+        # every token as it arrives, e.g. to start TTS on finished dialogue turns.
+        self.enhancer_token_callback = enhancer_token_callback
         self.summarizer_model = self._create_chat_model(summarizer_model, 0)
         self.scriptwriter_model = self._create_chat_model(scriptwriter_model, 0)
         self.enhancer_model = self._create_chat_model(enhancer_model, 0.7)
         self.timestamp = timestamp
 
-        self.summarizer_system_prompt = self.load_prompt("prompts/summarizer_prompt.txt", self.timestamp)
-        self.scriptwriter_system_prompt = self.load_prompt("prompts/scriptwriter_prompt.txt", self.timestamp)
-        self.enhancer_system_prompt = self.load_prompt("prompts/enhancer_prompt.txt", self.timestamp)
-
-    @staticmethod
-    def load_prompt(file_path, timestamp=None):
-        # Get the absolute path to the project root directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        root_dir = os.path.dirname(os.path.dirname(current_dir))
-        
-        if timestamp:
-            prompt_history_dir = os.path.join(root_dir, "prompt_history")
-            base_filename = os.path.basename(file_path)
-            history_file = f"{base_filename}_{timestamp}"
-            history_path = os.path.join(prompt_history_dir, history_file)
-            
-            if os.path.exists(history_path):
-                with open(history_path, 'r', encoding='utf-8') as file:
-                    return file.read().strip()
-        
-        # If no timestamp provided or file not found, fall back to the original prompt file
-        absolute_path = os.path.join(root_dir, file_path)
-        if not os.path.exists(absolute_path):
-            raise FileNotFoundError(f"Prompt file not found: {absolute_path}")
-        
-        with open(absolute_path, 'r', encoding='utf-8') as file:
-            return file.read().strip()
+        self.summarizer_system_prompt = prompt_cache.load("summarizer", self.timestamp)
+        self.scriptwriter_system_prompt = prompt_cache.load("scriptwriter", self.timestamp)
+        self.enhancer_system_prompt = prompt_cache.load("enhancer", self.timestamp)
 
     def _create_chat_model(self, model, temperature):
-        if self.provider == "OpenAI":
-            return ChatOpenAI(
-                model=model,
-                temperature=temperature,
-                max_tokens=None,
-                timeout=None,
-                max_retries=2,
-                api_key=self.api_key or os.getenv("OPENAI_API_KEY")
-            )
-        else:  # OpenRouter
-            return ChatOpenAI(
-                model=model,
-                temperature=temperature,
-                max_tokens=None,
-                timeout=None,
-                max_retries=2,
-                base_url="https://openrouter.ai/api/v1",
-                api_key=self.api_key or os.getenv("OPENROUTER_API_KEY")
-            )
-
-    @staticmethod
-    def load_prompt(file_path, timestamp=None):
-        # Get the absolute path to the project root directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        root_dir = os.path.dirname(os.path.dirname(current_dir))
-        
-        if timestamp:
-            prompt_history_dir = os.path.join(root_dir, "prompt_history")
-            base_filename = os.path.basename(file_path)
-            history_file = f"{base_filename}_{timestamp}"
-            history_path = os.path.join(prompt_history_dir, history_file)
-            
-            if os.path.exists(history_path):
-                with open(history_path, 'r', encoding='utf-8') as file:
-                    return file.read().strip()
-        
-        # If no timestamp provided or file not found, fall back to the original prompt file
-        absolute_path = os.path.join(root_dir, file_path)
-        if not os.path.exists(absolute_path):
-            raise FileNotFoundError(f"Prompt file not found: {absolute_path}")
-        
-        with open(absolute_path, 'r', encoding='utf-8') as file:
-            return file.read().strip()
-
-    def run_summarizer(self, state: PodcastState) -> PodcastState:
-        text = state["main_text"].content
-
-        if not text:
-            raise ValueError("The main_text content is empty.")
-
-        print("Summarizing the entire text to extract key points...")
+        return get_chat_model(self.provider, model, temperature, self.api_key)
+
+    # stage -> (input field, output field, error when the input is empty, log message)
+    STAGES = {
+        "summarizer": ("main_text", "key_points", "The main_text content is empty.",
+                       "Summarizing the entire text to extract key points..."),
+        "scriptwriter": ("key_points", "script_essence", "No key points found to generate the script.",
+                         "Generating script essence from key points..."),
+        "enhancer": ("script_essence", "enhanced_script", "No script essence found to enhance.",
+                     "Enhancing script with playful banter in dialogue form..."),
+    }
+
+    def _stage_model_and_prompt(self, stage):
+        return getattr(self, f"{stage}_model"), getattr(self, f"{stage}_system_prompt")
+
+    def _build_call(self, stage, chat_model, system_prompt, input_text):
         prompt = ChatPromptTemplate.from_messages([
-            ("system", self.summarizer_system_prompt),
-            ("human", "{text}")
+            ("system", system_prompt),
+            ("human", "{input}")
         ])
-        chain = prompt | self.summarizer_model
-        response = chain.invoke({"text": text})
-        key_points = response.content.strip()
-
-        state["key_points"] = HumanMessage(content=key_points)
+        chain = prompt | chat_model
+
+        # Pipelines running the same stage with the same model, prompt and input
+        # (e.g. the "random" and "last" podcasts falling back to the same
+        # prompt) share one LLM call instead of making identical requests.
+        temperature = chat_model.temperature or 0
+        key = make_stage_key(stage, self.provider, chat_model.model_name, temperature, system_prompt, input_text)
+        return chain, {"input": input_text}, key, temperature == 0
+
+    def _call(self, stage, chat_model, system_prompt, input_text) -> str:
+        chain, inputs, key, keep = self._build_call(stage, chat_model, system_prompt, input_text)
+        return stage_cache.get_or_compute(
+            key, lambda: chain.invoke(inputs).content.strip(), keep=keep
+        )
+
+    async def _acall(self, stage, chat_model, system_prompt, input_text) -> str:
+        chain, inputs, key, keep = self._build_call(stage, chat_model, system_prompt, input_text)
+
+        async def invoke():
+            response = await chain.ainvoke(inputs)
+            return response.content.strip()
+
+        return await stage_cache.aget_or_compute(key, invoke, keep=keep)
+
+    def _stage_input(self, stage, state: PodcastState) -> str:
+        input_field, _, empty_error, message = self.STAGES[stage]
+        input_text = state[input_field].content
+
+        if not input_text:
+            raise ValueError(empty_error)
+
+        print(message)
+        return input_text
+
+    def _callback(self, config, name):
+        # Per-run callbacks come in through the LangGraph config, so one compiled
+        # graph can serve many requests; the constructor values are the fallback.
+        configurable = (config or {}).get("configurable", {})
+        return configurable.get(name) or getattr(self, name)
+
+    def _complete_stage(self, stage, state: PodcastState, output: str, config=None) -> PodcastState:
+        _, output_field, _, _ = self.STAGES[stage]
+        state[output_field] = HumanMessage(content=output)
+        report_progress(self._callback(config, "progress_callback"), f"{stage}_done")
         return state
 
-    def run_scriptwriter(self, state: PodcastState) -> PodcastState:
-        key_points = state["key_points"].content
+    def _run_stage(self, stage, state: PodcastState, config=None) -> PodcastState:
+        input_text = self._stage_input(stage, state)
+        chat_model, system_prompt = self._stage_model_and_prompt(stage)
+        output = self._call(stage, chat_model, system_prompt, input_text)
+        return self._complete_stage(stage, state, output, config)
+
+    async def _arun_stage(self, stage, state: PodcastState, config=None) -> PodcastState:
+        input_text = self._stage_input(stage, state)
+        chat_model, system_prompt = self._stage_model_and_prompt(stage)
+        output = await self._acall(stage, chat_model, system_prompt, input_text)
+        return self._complete_stage(stage, state, output, config)
+
+    def _summarizer_chunks(self, text):
+        """
+        Returns the chunks to summarize in map-reduce mode, or None when the
+        text should go to the summarizer in a single request.
+        """
+        if self.summarizer_mode == "single":
+            return None
+        if self.summarizer_mode == "auto" and count_tokens(text) <= self.auto_map_reduce_tokens:
+            return None
+        chunks = split_text_into_chunks(text, self.map_reduce_chunk_tokens)
+        return chunks if len(chunks) > 1 else None
+
+    def _reduce_input(self, partial_key_points):
+        return SUMMARIZER_REDUCE_TEMPLATE.format(
+            num_chunks=len(partial_key_points),
+            partial_key_points="\n\n".join(
+                f"Part {i + 1}:\n{points}" for i, points in enumerate(partial_key_points)
+            ),
+        )
+
+    def run_map_reduce_summarizer(self, state: PodcastState, chunks, config=None) -> PodcastState:
+        print(f"Summarizing {len(chunks)} chunks of the text and merging their key points...")
+        with ThreadPoolExecutor(max_workers=min(len(chunks), self.max_parallel_chunks)) as executor:
+            partial_key_points = list(executor.map(
+                lambda chunk: self._call("summarizer_map", self.summarizer_model, self.summarizer_system_prompt, chunk),
+                chunks
+            ))
+        key_points = self._call(
+            "summarizer_reduce", self.summarizer_model, self.summarizer_system_prompt,
+            self._reduce_input(partial_key_points)
+        )
+        return self._complete_stage("summarizer", state, key_points, config)
+
+    async def arun_map_reduce_summarizer(self, state: PodcastState, chunks, config=None) -> PodcastState:
+        print(f"Summarizing {len(chunks)} chunks of the text and merging their key points...")
+        semaphore = asyncio.Semaphore(self.max_parallel_chunks)
+
+        async def summarize_chunk(chunk):
+            async with semaphore:
+                return await self._acall("summarizer_map", self.summarizer_model, self.summarizer_system_prompt, chunk)
+
+        partial_key_points = await asyncio.gather(*[summarize_chunk(chunk) for chunk in chunks])
+        key_points = await self._acall(
+            "summarizer_reduce", self.summarizer_model, self.summarizer_system_prompt,
+            self._reduce_input(partial_key_points)
+        )
+        return self._complete_stage("summarizer", state, key_points, config)
+
+    def run_summarizer(self, state: PodcastState, config=None) -> PodcastState:
+        text = state["main_text"].content
+        chunks = self._summarizer_chunks(text) if text else None
+        if chunks:
+            return self.run_map_reduce_summarizer(state, chunks, config)
+        return self._run_stage("summarizer", state, config)
 
-        if not key_points:
-            raise ValueError("No key points found to generate the script.")
+    def run_scriptwriter(self, state: PodcastState, config=None) -> PodcastState:
+        return self._run_stage("scriptwriter", state, config)
 
-        print("Generating script essence from key points...")
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", self.scriptwriter_system_prompt),
-            ("human", "{key_points}")
-        ])
-        chain = prompt | self.scriptwriter_model
-        response = chain.invoke({"key_points": key_points})
-        script_essence = response.content.strip()
+    def run_enhancer(self, state: PodcastState, config=None) -> PodcastState:
+        return self._run_stage("enhancer", state, config)
 
-        state["script_essence"] = HumanMessage(content=script_essence)
-        return state
+    # Async variants: LangGraph awaits these directly on the event loop, so a
+    # pipeline waiting on the LLM holds no thread.
+    async def arun_summarizer(self, state: PodcastState, config=None) -> PodcastState:
+        text = state["main_text"].content
+        chunks = await asyncio.to_thread(self._summarizer_chunks, text) if text else None
+        if chunks:
+            return await self.arun_map_reduce_summarizer(state, chunks, config)
+        return await self._arun_stage("summarizer", state, config)
 
-    def run_enhancer(self, state: PodcastState) -> PodcastState:
-        script_essence = state["script_essence"].content
+    async def arun_scriptwriter(self, state: PodcastState, config=None) -> PodcastState:
+        return await self._arun_stage("scriptwriter", state, config)
 
-        if not script_essence:
-            raise ValueError("No script essence found to enhance.")
+    async def arun_enhancer(self, state: PodcastState, config=None) -> PodcastState:
+        token_callback = self._callback(config, "enhancer_token_callback")
+        if token_callback is None:
+            return await self._arun_stage("enhancer", state, config)
+        return await self.astream_enhancer(state, token_callback, config)
 
-        print("Enhancing script with playful banter in dialogue form...")
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", self.enhancer_system_prompt),
-            ("human", "{script_essence}")
-        ])
-        chain = prompt | self.enhancer_model
-        response = chain.invoke({"script_essence": script_essence})
-        enhanced_script = response.content.strip()
+    async def astream_enhancer(self, state: PodcastState, token_callback, config=None) -> PodcastState:
+        input_text = self._stage_input("enhancer", state)
+        chain, inputs, _, _ = self._build_call("enhancer", self.enhancer_model, self.enhancer_system_prompt, input_text)
 
-        state["enhanced_script"] = HumanMessage(content=enhanced_script)
-        return state
+        parts = []
+        async for chunk in chain.astream(inputs):
+            if chunk.content:
+                parts.append(chunk.content)
+                token_callback(chunk.content)
 
+        return self._complete_stage("enhancer", state, "".join(parts).strip(), config)
 
-    def create_workflow(self) -> StateGraph:
+    def create_workflow(self, use_async=True) -> StateGraph:
         workflow = StateGraph(PodcastState)
         workflow.set_entry_point("summarizer")
-        workflow.add_node("summarizer", self.run_summarizer)
-        workflow.add_node("scriptwriter", self.run_scriptwriter)
-        workflow.add_node("enhancer", self.run_enhancer)
+        if use_async:
+            workflow.add_node("summarizer", self.arun_summarizer)
+            workflow.add_node("scriptwriter", self.arun_scriptwriter)
+            workflow.add_node("enhancer", self.arun_enhancer)
+        else:
+            workflow.add_node("summarizer", self.run_summarizer)
+            workflow.add_node("scriptwriter", self.run_scriptwriter)
+            workflow.add_node("enhancer", self.run_enhancer)
 
         workflow.add_edge("summarizer", "scriptwriter")
         workflow.add_edge("scriptwriter", "enhancer")
@@ -173,36 +257,11 @@ class PersonalityCreatorAgent:
         self.personality_prompt_template = personality_prompt or self.load_prompt("prompts/personality_creator_prompt.txt")
 
     def _create_chat_model(self, model, temperature):
-        if self.provider == "OpenAI":
-            return ChatOpenAI(
-                model=model,
-                temperature=temperature,
-                max_tokens=None,
-                timeout=None,
-                max_retries=2,
-                api_key=os.getenv("OPENAI_API_KEY")
-            )
-        else:  # OpenRouter
-            return ChatOpenAI(
-                model=model,
-                temperature=temperature,
-                max_tokens=None,
-                timeout=None,
-                max_retries=2,
-                base_url="https://openrouter.ai/api/v1",
-                api_key=os.getenv("OPENROUTER_API_KEY")
-            )
+        return get_chat_model(self.provider, model, temperature)
 
     @staticmethod
     def load_prompt(file_path):
-        # Get the absolute path to the project root directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        root_dir = os.path.dirname(os.path.dirname(current_dir))
-        absolute_path = os.path.join(root_dir, file_path)
-        if not os.path.exists(absolute_path):
-            raise FileNotFoundError(f"Prompt file not found: {absolute_path}")
-        with open(absolute_path, 'r', encoding='utf-8') as file:
-            return file.read().strip()
+        return prompt_cache.read(file_path)
 
     def create_personality(self) -> str:
         prompt = ChatPromptTemplate.from_template(self.personality_prompt_template)
@@ -219,34 +278,11 @@ class FeedbackAgent:
         self.feedback_prompt_template = feedback_prompt or self.load_prompt("prompts/feedback_prompt.txt")
 
     def _create_chat_model(self, model, temperature):
-        if self.provider == "OpenAI":
-            return ChatOpenAI(
-                model=model,
-                temperature=temperature,
-                max_tokens=None,
-                timeout=None,
-                max_retries=2,
-                api_key=os.environ.get("OPENAI_API_KEY")
-            )
-        else:  # OpenRouter
-            return ChatOpenAI(
-                model=model,
-                temperature=temperature,
-                max_tokens=None,
-                timeout=None,
-                max_retries=2,
-                base_url="https://openrouter.ai/api/v1",
-                api_key=os.environ.get("OPENROUTER_API_KEY")
-            )
+        return get_chat_model(self.provider, model, temperature)
 
     @staticmethod
     def load_prompt(file_path):
-        # Get the absolute path to the project root directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        root_dir = os.path.dirname(os.path.dirname(current_dir))
-        absolute_path = os.path.join(root_dir, file_path)
-        with open(absolute_path, 'r') as file:
-            return file.read().strip()
+        return prompt_cache.read(file_path)
 
     def run_feedback(self, original_text: str, final_product: str, personality: str) -> str:
         if not original_text or not final_product or not personality:
@@ -269,35 +305,12 @@ class WeightClippingAgent:
         self.model = self._create_chat_model(model, 0)
         self.prompt_template = self.load_prompt("prompts/weight_clipper_prompt.txt")
     def _create_chat_model(self, model, temperature):
-        if self.provider == "OpenAI":
-            return ChatOpenAI(
-                model=model,
-                temperature=temperature,
-                max_tokens=None,
-                timeout=None,
-                max_retries=2,
-                api_key=os.environ.get("OPENAI_API_KEY")
-            )
-        else:  # OpenRouter
-            return ChatOpenAI(
-                model=model,
-                temperature=temperature,
-                max_tokens=None,
-                timeout=None,
-                max_retries=2,
-                base_url="https://openrouter.ai/api/v1",
-                api_key=os.environ.get("OPENROUTER_API_KEY")
-            )
+        return get_chat_model(self.provider, model, temperature)
         
 
     @staticmethod
     def load_prompt(file_path):
-        # Get the absolute path to the project root directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        root_dir = os.path.dirname(os.path.dirname(current_dir))
-        absolute_path = os.path.join(root_dir, file_path)
-        with open(absolute_path, 'r') as file:
-            return file.read().strip()
+        return prompt_cache.read(file_path)
 
     def clean_prompt(self, system_prompt: str, role: str) -> str:
         prompt = ChatPromptTemplate.from_template(self.prompt_template)
@@ -312,34 +325,11 @@ class EvaluatorAgent:
         self.prompt_template = self.load_prompt("prompts/evaluator_prompt.txt")
 
     def _create_chat_model(self, model, temperature):
-        if self.provider == "OpenAI":
-            return ChatOpenAI(
-                model=model,
-                temperature=temperature,
-                max_tokens=None,
-                timeout=None,
-                max_retries=2,
-                api_key=os.environ.get("OPENAI_API_KEY")
-            )
-        else:  # OpenRouter
-            return ChatOpenAI(
-                model=model,
-                temperature=temperature,
-                max_tokens=None,
-                timeout=None,
-                max_retries=2,
-                base_url="https://openrouter.ai/api/v1",
-                api_key=os.environ.get("OPENROUTER_API_KEY")
-            )
+        return get_chat_model(self.provider, model, temperature)
 
     @staticmethod
     def load_prompt(file_path):
-        # Get the absolute path to the project root directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        root_dir = os.path.dirname(os.path.dirname(current_dir))
-        absolute_path = os.path.join(root_dir, file_path)
-        with open(absolute_path, 'r') as file:
-            return file.read().strip()
+        return prompt_cache.read(file_path)
 
     def evaluate_podcasts(self, original_text: str, podcast1: str, podcast2: str) -> str:
         prompt = ChatPromptTemplate.from_template(self.prompt_template)
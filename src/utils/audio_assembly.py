@@ -0,0 +1,155 @@
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+
+# Bitrates in kbps, indexed by the 4-bit bitrate field
+_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+_VERSIONS = {0b00: 2.5, 0b10: 2, 0b11: 1}
+_LAYERS = {0b01: 3, 0b10: 2, 0b11: 1}
+
+
+class Mp3FormatMismatch(ValueError):
+    pass
+
+
+class FrameHeader(NamedTuple):
+    version: float
+    layer: int
+    sample_rate: int
+    channels: int
+    has_crc: bool
+    length: int
+
+    @property
+    def stream_format(self):
+        return self.version, self.layer, self.sample_rate, self.channels
+
+
+def parse_frame_header(data, offset: int = 0) -> Optional[FrameHeader]:
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset], data[offset + 1], data[offset + 2], data[offset + 3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = _VERSIONS.get((b1 >> 3) & 0b11)
+    layer = _LAYERS.get((b1 >> 1) & 0b11)
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0b11
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrate = _BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 1
+
+    if layer == 1:
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and version != 1:
+        length = 72 * bitrate // sample_rate + padding
+    else:
+        length = 144 * bitrate // sample_rate + padding
+
+    channels = 1 if (b3 >> 6) == 0b11 else 2
+    has_crc = not (b1 & 1)
+    return FrameHeader(version, layer, sample_rate, channels, has_crc, length)
+
+
+def audio_start(data) -> int:
+    # Skip an ID3v2 tag; its size is a 28-bit "syncsafe" integer
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def audio_end(data) -> int:
+    # Drop a trailing ID3v1 tag
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        return len(data) - 128
+    return len(data)
+
+
+def is_info_frame(data, offset: int, header: FrameHeader) -> bool:
+    """
+    True for the Xing/Info/VBRI metadata frame encoders put at the start of a file.
+
+    It describes the length of the original file only, so it must not appear
+    in the middle of a concatenated stream.
+    """
+    if header.layer != 3:
+        return False
+    if header.version == 1:
+        side_info = 17 if header.channels == 1 else 32
+    else:
+        side_info = 9 if header.channels == 1 else 17
+    tag_offset = offset + 4 + (2 if header.has_crc else 0) + side_info
+    tag = bytes(data[tag_offset:tag_offset + 4])
+    return tag in (b"Xing", b"Info") or bytes(data[offset + 36:offset + 40]) == b"VBRI"
+
+
+def iter_mp3_frames(data) -> Iterator[tuple]:
+    """
+    Yields (header, frame) for every audio frame in an MP3 file, skipping tags,
+    metadata frames and any garbage between frames.
+    """
+    view = memoryview(data)
+    offset = audio_start(view)
+    end = audio_end(view)
+    first = True
+    while offset < end:
+        header = parse_frame_header(view, offset)
+        if header is None or header.length <= 4 or offset + header.length > end:
+            offset += 1
+            continue
+        if not (first and is_info_frame(view, offset, header)):
+            yield header, view[offset:offset + header.length]
+        first = False
+        offset += header.length
+
+
+class Mp3Assembler:
+    """
+    Concatenates MP3 segments by copying their frames into one output stream.
+
+    No segment is ever decoded, and each one can be dropped as soon as it has
+    been appended, so with a file as output memory stays proportional to a
+    single compressed segment no matter how long the episode is. All segments
+    must share the same MPEG version, layer, sample rate and channel count
+    (which is always the case for one TTS model); otherwise Mp3FormatMismatch
+    is raised.
+    """
+
+    def __init__(self, output: BinaryIO):
+        self.output = output
+        self.stream_format = None
+        self.bytes_written = 0
+        self.frames_written = 0
+
+    def append(self, segment: bytes) -> int:
+        written = 0
+        for header, frame in iter_mp3_frames(segment):
+            if self.stream_format is None:
+                self.stream_format = header.stream_format
+            elif header.stream_format != self.stream_format:
+                raise Mp3FormatMismatch(
+                    f"Segment format {header.stream_format} does not match stream format {self.stream_format}"
+                )
+            self.output.write(frame)
+            written += len(frame)
+            self.frames_written += 1
+        self.bytes_written += written
+        return written
@@ -0,0 +1,84 @@
+import asyncio
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+try:
+    from src.utils.audio_assembly import iter_mp3_frames
+except ImportError:
+    from utils.audio_assembly import iter_mp3_frames
+
+
+class SegmentStream:
+    """
+    Collects TTS segments of one podcast as they finish and replays them in
+    dialogue order to any number of listeners.
+
+    Segments are synthesized concurrently and can complete out of order; a
+    listener receives segment N as soon as segments 0..N are all available.
+    Each segment is reduced to its MP3 audio frames, so the chunks form one
+    continuous MP3 stream.
+    """
+
+    def __init__(self):
+        self._segments: Dict[int, bytes] = {}
+        self._total: Optional[int] = None
+        self._error: Optional[str] = None
+        self._changed = asyncio.Condition()
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def set_total(self, total: int) -> None:
+        self._total = total
+        await self._notify()
+
+    async def put(self, index: int, audio_content: bytes) -> None:
+        self._segments[index] = b"".join(bytes(frame) for _, frame in iter_mp3_frames(audio_content))
+        await self._notify()
+
+    async def fail(self, error: str) -> None:
+        self._error = error
+        await self._notify()
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(
+                    lambda: index in self._segments
+                    or self._error is not None
+                    or (self._total is not None and index >= self._total)
+                )
+            if index in self._segments:
+                yield self._segments[index]
+                index += 1
+            else:
+                # Either every segment was sent or the pipeline failed
+                return
+
+
+class AudioStreamRegistry:
+    """
+    In-process registry of live podcast streams, keyed by (task_id, podcast_type).
+    """
+
+    def __init__(self):
+        self._streams: Dict[Tuple[str, str], SegmentStream] = {}
+
+    def create(self, task_id: str, podcast_type: str) -> SegmentStream:
+        stream = SegmentStream()
+        self._streams[(task_id, podcast_type)] = stream
+        return stream
+
+    def get(self, task_id: str, podcast_type: str) -> Optional[SegmentStream]:
+        return self._streams.get((task_id, podcast_type))
+
+    async def close(self, task_id: str) -> None:
+        # Listeners already attached keep their reference: they receive every
+        # segment that was produced and then stop instead of waiting forever.
+        for key in [key for key in self._streams if key[0] == task_id]:
+            stream = self._streams.pop(key)
+            await stream.fail("Stream closed")
+
+
+audio_stream_registry = AudioStreamRegistry()
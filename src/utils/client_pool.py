@@ -0,0 +1,119 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import Dict, Optional
+
+import httpx
+from langchain_openai import ChatOpenAI
+from openai import AsyncOpenAI, OpenAI
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Shared keep-alive pools: every client created here reuses these connections
+# instead of opening a new pool (and new TLS handshakes) per podcast.
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+HTTP_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+# Async pools are bound to the event loop that uses them
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_chat_models: Dict[tuple, ChatOpenAI] = {}
+_loop_chat_models: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, ChatOpenAI]]" = weakref.WeakKeyDictionary()
+_openai_clients: Dict[tuple, OpenAI] = {}
+_async_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def resolve_api_key(provider: str, api_key: Optional[str] = None) -> Optional[str]:
+    if api_key:
+        return api_key
+    return os.getenv("OPENAI_API_KEY") if provider == "OpenAI" else os.getenv("OPENROUTER_API_KEY")
+
+
+def get_http_client() -> httpx.Client:
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        return _http_client
+
+
+def get_async_http_client() -> Optional[httpx.AsyncClient]:
+    loop = _running_loop()
+    if loop is None:
+        return None
+    with _lock:
+        client = _async_http_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+            _async_http_clients[loop] = client
+        return client
+
+
+def get_chat_model(provider: str, model: str, temperature: float, api_key: Optional[str] = None) -> ChatOpenAI:
+    """
+    Returns a shared ChatOpenAI for (provider, model, temperature, api key).
+
+    Models created inside an event loop also share that loop's async
+    connection pool; ones created outside it share the sync pool only.
+    """
+    api_key = resolve_api_key(provider, api_key)
+    loop = _running_loop()
+    key = (provider, model, temperature, api_key)
+
+    with _lock:
+        chat_models = _loop_chat_models.setdefault(loop, {}) if loop else _chat_models
+        chat_model = chat_models.get(key)
+    if chat_model is not None:
+        return chat_model
+
+    kwargs = dict(
+        model=model,
+        temperature=temperature,
+        max_tokens=None,
+        timeout=None,
+        max_retries=2,
+        api_key=api_key,
+        http_client=get_http_client(),
+    )
+    async_http_client = get_async_http_client()
+    if async_http_client is not None:
+        kwargs["http_async_client"] = async_http_client
+    if provider != "OpenAI":  # OpenRouter
+        kwargs["base_url"] = OPENROUTER_BASE_URL
+
+    chat_model = ChatOpenAI(**kwargs)
+    with _lock:
+        return chat_models.setdefault(key, chat_model)
+
+
+def get_openai_client(api_key: Optional[str] = None, max_retries: int = 2) -> OpenAI:
+    key = (api_key, max_retries)
+    http_client = get_http_client()
+    with _lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            client = OpenAI(api_key=api_key, max_retries=max_retries, http_client=http_client)
+            _openai_clients[key] = client
+        return client
+
+
+def get_async_openai_client(api_key: Optional[str] = None, max_retries: int = 2) -> AsyncOpenAI:
+    loop = asyncio.get_running_loop()
+    key = (api_key, max_retries)
+    async_http_client = get_async_http_client()
+    with _lock:
+        clients = _async_openai_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key, max_retries=max_retries, http_client=async_http_client)
+            clients[key] = client
+        return client
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class EventLog:
+    """
+    Append-only JSONL log for user events (experiment ideas, feedback, votes).
+
+    Each event is one line, so recording it costs O(event size) instead of
+    rewriting a whole file. Once start() has been awaited inside an event loop,
+    log() only enqueues the event (from the loop or from worker threads) and a
+    background task appends batches of lines off the loop; without a running
+    writer, e.g. in command-line scripts, events are appended synchronously.
+
+    Events logged with a `key` are also indexed in memory, so the latest one
+    for that key can be read back before it has reached the disk. latest()
+    also reads whatever the file gained since its previous call, so events
+    that other processes (CLI scripts, other workers) append are picked up.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        # (kind, key) -> latest event, from the file up to _offset and from this process
+        self._on_disk: Dict[Tuple[str, str], Dict] = {}
+        self._offset = 0
+        self._index_lock = threading.Lock()
+        self._logged: Dict[Tuple[str, str], Dict] = {}
+
+    async def start(self) -> None:
+        if self._writer is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.ensure_future(self._run_writer())
+
+    async def stop(self) -> None:
+        """
+        Writes out everything still queued and stops the background writer.
+        """
+        if self._writer is None:
+            return
+        await self._queue.join()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._loop = self._queue = self._writer = None
+
+    def log(self, kind: str, key: Optional[str] = None, **data) -> Dict:
+        event = {"kind": kind, "time": time.time(), **data}
+        if key is not None:
+            event["key"] = key
+            with self._lock:
+                self._logged[(kind, key)] = event
+
+        line = json.dumps(event) + "\n"
+        loop = self._loop
+        if loop is None:
+            self._append([line])
+            return event
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._queue.put_nowait(line)
+        else:
+            loop.call_soon_threadsafe(self._queue.put_nowait, line)
+        return event
+
+    async def _run_writer(self) -> None:
+        while True:
+            lines = [await self._queue.get()]
+            while not self._queue.empty():
+                lines.append(self._queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._append, lines)
+            except Exception as e:
+                logger.error(f"Could not write {len(lines)} events to {self.path}: {e}")
+            finally:
+                for _ in lines:
+                    self._queue.task_done()
+
+    def _append(self, lines: List[str]) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    def read(self, kind: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Yields the events that have reached the disk, oldest first.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if kind is None or event.get("kind") == kind:
+                    yield event
+
+    def _index_new_lines(self) -> None:
+        # Caller holds _index_lock. Only complete lines are consumed, so an
+        # event another process is still writing is read on the next call.
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if size < self._offset:
+            # The file was truncated or replaced: index it again from the start
+            self._on_disk, self._offset = {}, 0
+        if size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "key" in event:
+                self._on_disk[(event["kind"], event["key"])] = event
+        self._offset += end
+
+    def latest(self, kind: str, key: str) -> Optional[Dict]:
+        with self._index_lock:
+            self._index_new_lines()
+            on_disk = self._on_disk.get((kind, key))
+        with self._lock:
+            logged = self._logged.get((kind, key))
+        if on_disk is None or logged is None:
+            return on_disk or logged
+        return logged if logged["time"] >= on_disk["time"] else on_disk
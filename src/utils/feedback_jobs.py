@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+from uuid import uuid4
+
+try:
+    from src.utils.task_store import TaskStore
+except ImportError:
+    from utils.task_store import TaskStore
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackJobQueue:
+    """
+    Runs prompt optimization rounds as background jobs.
+
+    submit() returns a job id immediately; the round itself runs on a
+    dedicated thread pool so the event loop keeps serving other requests.
+    Feedback on the same podcast (same old and new timestamp) that arrives
+    within `coalesce_seconds` of the first submission joins the same job, so a
+    burst of feedback triggers a single optimization round over all of it. Job
+    status is kept in the task store, so any worker can report it.
+    """
+
+    def __init__(
+        self,
+        process_fn: Callable[[str, Optional[str], str], None],
+        store: TaskStore,
+        coalesce_seconds: float = 5.0,
+        max_workers: int = 1,
+    ):
+        self.process_fn = process_fn
+        self.store = store
+        self.coalesce_seconds = coalesce_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prompt-optimizer")
+        # (old timestamp, new timestamp) -> job that has not started yet and still accepts feedback
+        self._pending: Dict[Tuple[Optional[str], str], Dict] = {}
+        self._running = set()
+
+    def _status(self, job: Dict, status: str, **details) -> None:
+        self.store.set(job["job_id"], {
+            "status": status,
+            "old_timestamp": job["old_timestamp"],
+            "new_timestamp": job["new_timestamp"],
+            "feedback_count": len(job["feedback"]),
+            **details,
+        })
+
+    def submit(self, feedback: str, old_timestamp: Optional[str], new_timestamp: str) -> Dict:
+        key = (old_timestamp, new_timestamp)
+        job = self._pending.get(key)
+        if job is not None:
+            job["feedback"].append(feedback)
+            self._status(job, "queued")
+            logger.info(f"Feedback coalesced into job {job['job_id']} ({len(job['feedback'])} items)")
+            return {"job_id": job["job_id"], "status": "queued", "coalesced": True}
+
+        job = {
+            "job_id": str(uuid4()),
+            "old_timestamp": old_timestamp,
+            "new_timestamp": new_timestamp,
+            "feedback": [feedback],
+        }
+        self._pending[key] = job
+        self.store.create(job["job_id"], {"status": "queued"})
+        self._status(job, "queued")
+        asyncio.get_running_loop().call_later(self.coalesce_seconds, self._start, key)
+        logger.info(f"Queued prompt optimization job {job['job_id']}")
+        return {"job_id": job["job_id"], "status": "queued", "coalesced": False}
+
+    def _start(self, key: Tuple[Optional[str], str]) -> None:
+        task = asyncio.ensure_future(self._run(key))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, key: Tuple[Optional[str], str]) -> None:
+        job = self._pending.pop(key)
+        feedback = "\n\n".join(job["feedback"])
+        loop = asyncio.get_running_loop()
+
+        self._status(job, "running")
+        started = time.monotonic()
+        try:
+            await loop.run_in_executor(self._executor, self.process_fn, feedback, job["old_timestamp"], job["new_timestamp"])
+        except Exception as e:
+            logger.error(f"Prompt optimization job {job['job_id']} failed: {str(e)}", exc_info=True)
+            self._status(job, "failed", error=str(e))
+            return
+        self._status(job, "completed", duration=round(time.monotonic() - started, 2))
+        logger.info(f"Prompt optimization job {job['job_id']} completed")
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
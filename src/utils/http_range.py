@@ -0,0 +1,89 @@
+import os
+import re
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(path: str) -> str:
+    stat = os.stat(path)
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range `Range` header into an inclusive (start, end) pair.
+
+    Returns None when the header is not a single byte range we can serve, and
+    raises ValueError when the range is unsatisfiable for a file of `file_size`.
+    """
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        return None
+
+    start_str, end_str = match.groups()
+    if not start_str and not end_str:
+        return None
+
+    if not start_str:
+        # Suffix range: the last N bytes
+        length = int(end_str)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(file_size - length, 0), file_size - 1
+
+    start = int(start_str)
+    end = int(end_str) if end_str else file_size - 1
+    if start >= file_size or end < start:
+        raise ValueError("Unsatisfiable range")
+    return start, min(end, file_size - 1)
+
+
+def iter_file(path: str, start: int, end: int) -> Iterator[bytes]:
+    remaining = end - start + 1
+    with open(path, "rb") as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(request: Request, path: str, media_type: str) -> Response:
+    """
+    Streams a file from disk, honouring `Range`, `If-Range` and `If-None-Match`.
+    """
+    file_size = os.path.getsize(path)
+    etag = file_etag(path)
+    headers = {"Accept-Ranges": "bytes", "ETag": etag, "Cache-Control": "private, max-age=3600"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_range_header(range_header, file_size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{file_size}"
+            return Response(status_code=416, headers=headers)
+
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                iter_file(path, start, end), status_code=206, media_type=media_type, headers=headers
+            )
+
+    headers["Content-Length"] = str(file_size)
+    return StreamingResponse(iter_file(path, 0, file_size - 1), media_type=media_type, headers=headers)
@@ -0,0 +1,64 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import diskcache
+
+logger = logging.getLogger(__name__)
+
+
+def pdf_digest(pdf_content: bytes) -> str:
+    return hashlib.sha256(pdf_content).hexdigest()
+
+
+class PdfTextCache:
+    """
+    Content-addressed cache for extracted PDF text.
+
+    Entries are keyed by the SHA-256 of the PDF bytes and hold the extracted
+    text together with its token count. A small in-memory LRU sits in front
+    of an on-disk store, so a paper that was parsed once (by this process or
+    a previous one) is never parsed again.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 32, size_limit: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = diskcache.Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+
+    def get(self, digest: str) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            entry = self._memory.get(digest)
+            if entry is not None:
+                self._memory.move_to_end(digest)
+                return entry
+
+        entry = self._disk.get(digest)
+        if entry is None:
+            return None
+
+        entry = (entry["text"], entry["token_count"])
+        self._remember(digest, entry)
+        return entry
+
+    def set(self, digest: str, text: str, token_count: int) -> None:
+        self._remember(digest, (text, token_count))
+        try:
+            self._disk.set(digest, {"text": text, "token_count": token_count})
+        except Exception as e:
+            logger.warning(f"Could not persist extracted PDF text for {digest}: {e}")
+
+    def _remember(self, digest: str, entry: Tuple[str, int]) -> None:
+        with self._lock:
+            self._memory[digest] = entry
+            self._memory.move_to_end(digest)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        self._disk.clear()
@@ -0,0 +1,83 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+import PyPDF2
+
+logger = logging.getLogger(__name__)
+
+
+def count_pdf_pages(pdf_content: bytes) -> int:
+    return len(PyPDF2.PdfReader(io.BytesIO(pdf_content)).pages)
+
+
+def extract_page_range(pdf_content: bytes, start: int, end: int) -> str:
+    # Runs inside worker processes, so it must stay a picklable module-level function.
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+    return "".join(pdf_reader.pages[i].extract_text() for i in range(start, end))
+
+
+def split_page_ranges(num_pages: int, pages_per_chunk: int) -> List[Tuple[int, int]]:
+    return [(start, min(start + pages_per_chunk, num_pages)) for start in range(0, num_pages, pages_per_chunk)]
+
+
+class PdfExtractionEngine:
+    """
+    Extracts PDF text either in-process or across a process pool.
+
+    Small documents (fewer than `min_pages_for_pool` pages) are extracted in a
+    worker thread of the current process. Larger ones are split into page
+    ranges which are extracted in parallel by a `ProcessPoolExecutor`, so the
+    pure-Python PyPDF2 work never runs on the event loop.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, min_pages_for_pool: int = 12, pages_per_chunk: int = 6):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.min_pages_for_pool = min_pages_for_pool
+        self.pages_per_chunk = pages_per_chunk
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # The pool is created lazily inside a process that already runs an
+            # event loop, client pools and other threads, which fork() does not
+            # copy safely, so workers are started from a clean interpreter.
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    def extract(self, pdf_content: bytes) -> str:
+        return extract_page_range(pdf_content, 0, count_pdf_pages(pdf_content))
+
+    async def extract_async(self, pdf_content: bytes) -> str:
+        num_pages = await asyncio.to_thread(count_pdf_pages, pdf_content)
+
+        if num_pages < self.min_pages_for_pool or self.max_workers < 2:
+            return await asyncio.to_thread(extract_page_range, pdf_content, 0, num_pages)
+
+        page_ranges = split_page_ranges(num_pages, self.pages_per_chunk)
+        logger.info(f"Extracting {num_pages} PDF pages in {len(page_ranges)} chunks across {self.max_workers} processes")
+
+        loop = asyncio.get_running_loop()
+        try:
+            executor = self._get_executor()
+            chunks = await asyncio.gather(*[
+                loop.run_in_executor(executor, extract_page_range, pdf_content, start, end)
+                for start, end in page_ranges
+            ])
+        except BrokenProcessPool:
+            logger.warning("PDF extraction pool is broken, falling back to in-process extraction")
+            self._executor = None
+            return await asyncio.to_thread(extract_page_range, pdf_content, 0, num_pages)
+
+        return "".join(chunks)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
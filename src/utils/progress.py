@@ -0,0 +1,86 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Callback signature used by the pipeline hooks: progress_callback(stage, **details)
+ProgressCallback = Callable[..., None]
+
+
+def report_progress(progress_callback: Optional[ProgressCallback], stage: str, **details) -> None:
+    if progress_callback is None:
+        return
+    try:
+        progress_callback(stage, **details)
+    except Exception as e:
+        # Progress reporting must never break podcast creation
+        print(f"Progress callback failed for stage {stage}: {e}")
+
+
+def format_sse(event: Dict) -> str:
+    return f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+
+class ProgressBroker:
+    """
+    Fans out pipeline progress events to subscribers of a task.
+
+    `publish` may be called from any thread (LangGraph runs synchronous nodes in
+    worker threads); events are handed to each subscriber's event loop with
+    `call_soon_threadsafe`. Events are kept per task until `close` so that a
+    client connecting late still receives the stages it missed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._history: Dict[str, List[Dict]] = {}
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    def open(self, task_id: str) -> None:
+        with self._lock:
+            self._history.setdefault(task_id, [])
+
+    def is_open(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._history
+
+    def publish(self, task_id: str, stage: str, **details) -> None:
+        event = {"task_id": task_id, "stage": stage, "time": time.time(), **details}
+        with self._lock:
+            if task_id not in self._history:
+                return
+            self._history[task_id].append(event)
+            subscribers = list(self._subscribers.get(task_id, []))
+
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def close(self, task_id: str) -> None:
+        with self._lock:
+            self._history.pop(task_id, None)
+            subscribers = self._subscribers.pop(task_id, [])
+
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    def subscribe(self, task_id: str) -> Tuple[List[Dict], asyncio.Queue]:
+        queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            history = list(self._history.get(task_id, []))
+            if task_id in self._history:
+                self._subscribers.setdefault(task_id, []).append((loop, queue))
+            else:
+                # Nothing is running for this task in this process
+                queue.put_nowait(None)
+        return history, queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(task_id)
+            if subscribers:
+                self._subscribers[task_id] = [(l, q) for l, q in subscribers if q is not queue]
+
+
+progress_broker = ProgressBroker()
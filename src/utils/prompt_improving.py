@@ -1,6 +1,6 @@
 import textgrad as tg
 import os
-from .utils import load_prompt, load_podcast_state, format_text_with_line_breaks
+from .utils import load_prompt, load_podcast_state, format_text_with_line_breaks, prompt_index
 from .agents_and_workflows import WeightClippingAgent
 
 def optimize_prompt(role, old_timestamp, new_timestamp, engine_model, backward_engine):
@@ -31,7 +31,7 @@ def optimize_prompt(role, old_timestamp, new_timestamp, engine_model, backward_e
     model = tg.BlackboxLLM(llm_engine, system_prompt=system_prompt)
 
     # Load the podcast state using the new timestamp
-    data = load_podcast_state(new_timestamp)
+    data = load_podcast_state(new_timestamp, fields=[json_key, "feedback"])
 
     # Define the user prompt (fixed) using the data from the JSON
     user_prompt = tg.Variable(data[json_key], 
@@ -80,4 +80,5 @@ def optimize_prompt(role, old_timestamp, new_timestamp, engine_model, backward_e
     formatted_prompt = format_text_with_line_breaks(cleaned_prompt)
     with open(new_history_file, "w") as f:
         f.write(formatted_prompt)
+    prompt_index.record(role, new_timestamp, os.path.basename(new_history_file), formatted_prompt, parent=old_timestamp)
     print(f"\nOptimized, cleaned, and formatted system prompt for {role} saved to '{new_history_file}'")
@@ -0,0 +1,171 @@
+import bisect
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+MANIFEST_FILE = "index.json"
+
+# Both naming schemes found in prompt_history:
+#   summarizer_prompt_20241001_072128.txt   (optimize_prompt)
+#   summarizer_prompt.txt_20241001_072128   (older runs)
+_HISTORY_FILE = re.compile(r"^(?P<role>[a-z_]+?)_prompt(?:\.txt)?_(?P<timestamp>\d{8}_\d{6})(?:\.txt)?$")
+
+
+def hash_prompt(text: str) -> str:
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
+class PromptIndex:
+    """
+    Manifest of optimized prompt versions in the prompt_history directory.
+
+    For every timestamp the manifest records, per role, the history file, the
+    SHA-256 of the prompt text and the parent version it was optimized from.
+    It is updated whenever a prompt is written, so "latest", "random" and
+    "by timestamp" lookups never scan the directory; the in-memory copy is
+    reloaded only when another process has rewritten the manifest.
+    """
+
+    def __init__(self, history_dir: str):
+        self.history_dir = history_dir
+        self.manifest_path = os.path.join(history_dir, MANIFEST_FILE)
+        self._lock = threading.RLock()
+        self._mtime = None
+        self._versions: Dict[str, Dict[str, Dict]] = {}
+        self._timestamps: List[str] = []
+
+    @contextmanager
+    def _file_lock(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.history_dir, exist_ok=True)
+            with open(self.manifest_path + ".lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _set_versions(self, versions: Dict[str, Dict[str, Dict]]) -> None:
+        self._versions = versions
+        self._timestamps = sorted(versions)
+
+    def _refresh(self, locked: bool = False) -> None:
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            if locked:
+                self._rebuild_locked()
+            elif os.path.isdir(self.history_dir):
+                self.rebuild()
+            else:
+                self._set_versions({})
+            return
+
+        if mtime != self._mtime:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self._set_versions(json.load(f).get("versions", {}))
+            self._mtime = mtime
+
+    def _write_manifest(self) -> None:
+        os.makedirs(self.history_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"versions": self._versions}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+        self._mtime = os.stat(self.manifest_path).st_mtime_ns
+
+    def rebuild(self) -> None:
+        """
+        Recreates the manifest from the files in prompt_history (parents are
+        unknown for versions recorded this way).
+        """
+        with self._file_lock():
+            self._rebuild_locked()
+
+    def _rebuild_locked(self) -> None:
+        # Caller holds _file_lock(); flock is per open file, so taking it again would block
+        versions: Dict[str, Dict[str, Dict]] = {}
+        if os.path.isdir(self.history_dir):
+            for filename in os.listdir(self.history_dir):
+                match = _HISTORY_FILE.match(filename)
+                if not match:
+                    continue
+                timestamp = match.group("timestamp")
+                try:
+                    datetime.strptime(timestamp, "%Y%m%d_%H%M%S")
+                except ValueError:
+                    print(f"Warning: Invalid timestamp format in file '{filename}'")
+                    continue
+                with open(os.path.join(self.history_dir, filename), "r", encoding="utf-8") as f:
+                    text = f.read()
+                versions.setdefault(timestamp, {})[match.group("role")] = {
+                    "file": filename,
+                    "sha256": hash_prompt(text),
+                    "parent": None,
+                }
+        self._set_versions(versions)
+        self._write_manifest()
+
+    def record(self, role: str, timestamp: str, filename: str, text: str, parent: Optional[str] = None) -> None:
+        with self._file_lock():
+            self._mtime = None
+            self._refresh(locked=True)
+            self._versions.setdefault(timestamp, {})[role] = {
+                "file": filename,
+                "sha256": hash_prompt(text),
+                "parent": parent,
+            }
+            if timestamp not in self._timestamps:
+                bisect.insort(self._timestamps, timestamp)
+            self._write_manifest()
+
+    def all_timestamps(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._timestamps)
+
+    def latest(self) -> Optional[str]:
+        with self._lock:
+            self._refresh()
+            return self._timestamps[-1] if self._timestamps else None
+
+    def random(self, exclude: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            self._refresh()
+            if not self._timestamps:
+                return None
+            # Rejection sampling keeps this O(1) instead of building a filtered list
+            if len(self._timestamps) == 1:
+                return None if self._timestamps[0] == exclude else self._timestamps[0]
+            while True:
+                timestamp = random.choice(self._timestamps)
+                if timestamp != exclude:
+                    return timestamp
+
+    def sample(self, n: int) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return random.sample(self._timestamps, min(n, len(self._timestamps)))
+
+    def get(self, role: str, timestamp: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh()
+            return self._versions.get(timestamp, {}).get(role)
+
+    def get_path(self, role: str, timestamp: str) -> Optional[str]:
+        entry = self.get(role, timestamp)
+        return os.path.join(self.history_dir, entry["file"]) if entry else None
@@ -0,0 +1,72 @@
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    from src.utils.prompt_index import PromptIndex
+except ImportError:
+    from utils.prompt_index import PromptIndex
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Manifest of prompt versions in prompt_history, kept up to date by optimize_prompt
+prompt_index = PromptIndex(os.path.join(ROOT_DIR, "prompt_history"))
+
+
+class PromptCache:
+    """
+    Resolves prompts to their text and keeps them in memory.
+
+    A prompt version is located through the prompt index (both history naming
+    schemes are understood) and falls back to the original file in prompts/.
+    File contents are cached by path and re-read only when the file's mtime or
+    size changes, so edits to prompts/ or rewritten history files are picked up
+    without reading every prompt from disk for every podcast.
+    """
+
+    def __init__(self, root_dir: str, index: PromptIndex):
+        self.root_dir = root_dir
+        self.index = index
+        self._lock = threading.Lock()
+        self._files: Dict[str, Tuple[int, int, str]] = {}
+
+    def read(self, path: str) -> str:
+        absolute_path = os.path.join(self.root_dir, path)
+        try:
+            stat = os.stat(absolute_path)
+        except FileNotFoundError:
+            with self._lock:
+                self._files.pop(absolute_path, None)
+            raise FileNotFoundError(f"Prompt file not found: {absolute_path}")
+
+        with self._lock:
+            cached = self._files.get(absolute_path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        with open(absolute_path, 'r', encoding='utf-8') as file:
+            text = file.read().strip()
+        with self._lock:
+            self._files[absolute_path] = (stat.st_mtime_ns, stat.st_size, text)
+        return text
+
+    def resolve(self, role: str, timestamp: Optional[str] = None) -> str:
+        """
+        Returns the path of the prompt for `role` at `timestamp`, or of the
+        original prompt when there is no such version.
+        """
+        if timestamp:
+            history_path = self.index.get_path(role, timestamp)
+            if history_path and os.path.exists(history_path):
+                return history_path
+        return os.path.join(self.root_dir, "prompts", f"{role}_prompt.txt")
+
+    def load(self, role: str, timestamp: Optional[str] = None) -> str:
+        return self.read(self.resolve(role, timestamp))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._files.clear()
+
+
+prompt_cache = PromptCache(ROOT_DIR, prompt_index)
@@ -0,0 +1,142 @@
+import json
+import math
+import random
+import re
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ELO_BASE = 1500.0
+ELO_SCALE = 400.0
+
+# Score of podcast 1 for each verdict the evaluator may give
+VERDICT_SCORES = {"1": 1.0, "2": 0.0, "tie": 0.5}
+
+
+def parse_verdict(text: str) -> Optional[float]:
+    """
+    Parses the evaluator's answer into the score of podcast 1 (1, 0 or 0.5 for
+    a tie). The structured format is a JSON object such as
+    {"winner": "1", "reason": "..."}; a bare "1" or "2" is still accepted.
+    Returns None when the answer cannot be understood.
+    """
+    if not text:
+        return None
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match:
+        try:
+            winner = str(json.loads(match.group(0)).get("winner", "")).strip().lower()
+        except (json.JSONDecodeError, AttributeError):
+            winner = ""
+        if winner in VERDICT_SCORES:
+            return VERDICT_SCORES[winner]
+    answer = text.strip().strip('".').lower()
+    return VERDICT_SCORES.get(answer)
+
+
+def expected_score(rating_a: float, rating_b: float) -> float:
+    return 1.0 / (1.0 + 10 ** ((rating_b - rating_a) / ELO_SCALE))
+
+
+class RatingEngine:
+    """
+    Ratings for prompt versions from pairwise evaluator verdicts.
+
+    record() applies an incremental Elo update as each match finishes and adds
+    the result to the win matrix; fit_bradley_terry() fits Bradley-Terry
+    strengths to the whole matrix on demand (reported on the Elo scale, so
+    both are comparable). Unlike raw win counts, neither favours versions
+    that simply played more often. next_pair() picks the most informative
+    match to play next.
+    """
+
+    def __init__(self, players: Sequence[Hashable] = (), k_factor: float = 32.0):
+        self.k_factor = k_factor
+        self._index: Dict[Hashable, int] = {}
+        self.players: List[Hashable] = []
+        self.elo: Dict[Hashable, float] = {}
+        # wins[i, j]: points player i scored against player j (ties count half)
+        self.wins = np.zeros((0, 0))
+        for player in players:
+            self.add_player(player)
+
+    def add_player(self, player: Hashable) -> int:
+        if player in self._index:
+            return self._index[player]
+        self._index[player] = len(self.players)
+        self.players.append(player)
+        self.elo[player] = ELO_BASE
+        self.wins = np.pad(self.wins, ((0, 1), (0, 1)))
+        return self._index[player]
+
+    def games(self, a: Hashable, b: Hashable) -> float:
+        i, j = self._index[a], self._index[b]
+        return self.wins[i, j] + self.wins[j, i]
+
+    def games_played(self, player: Hashable) -> float:
+        i = self._index[player]
+        return self.wins[i, :].sum() + self.wins[:, i].sum()
+
+    def record(self, a: Hashable, b: Hashable, score_a: float) -> None:
+        i, j = self.add_player(a), self.add_player(b)
+        if i == j:
+            return
+        self.wins[i, j] += score_a
+        self.wins[j, i] += 1.0 - score_a
+
+        expected_a = expected_score(self.elo[a], self.elo[b])
+        self.elo[a] += self.k_factor * (score_a - expected_a)
+        self.elo[b] -= self.k_factor * (score_a - expected_a)
+
+    def fit_bradley_terry(self, max_iterations: int = 1000, tol: float = 1e-9, prior: float = 0.1) -> Dict[Hashable, float]:
+        """
+        Maximum-likelihood Bradley-Terry fit with the MM algorithm (Hunter, 2004).
+
+        `prior` adds that many virtual points between every pair of players,
+        which keeps the fit finite for unbeaten versions or a disconnected
+        match graph.
+        """
+        n = len(self.players)
+        if n == 0:
+            return {}
+        wins = self.wins + prior * (1 - np.eye(n))
+        games = wins + wins.T
+        total_wins = wins.sum(axis=1)
+        strengths = np.ones(n)
+        for _ in range(max_iterations):
+            denominators = (games / (strengths[:, None] + strengths[None, :])).sum(axis=1)
+            updated = total_wins / denominators
+            updated /= np.exp(np.log(updated).mean())
+            converged = np.max(np.abs(updated - strengths)) < tol
+            strengths = updated
+            if converged:
+                break
+        ratings = ELO_BASE + ELO_SCALE * np.log10(strengths)
+        return {player: float(ratings[i]) for i, player in enumerate(self.players)}
+
+    def next_pair(self, rng: Optional[random.Random] = None, in_flight: Optional[Dict[frozenset, int]] = None) -> Tuple[Hashable, Hashable]:
+        """
+        Chooses the pair whose result is least predictable relative to how
+        often it has been played: p(1-p) / sqrt(1 + games), with p the Elo
+        win probability. Evenly matched, rarely compared versions come first,
+        so the ranking settles with fewer comparisons than uniform sampling.
+        `in_flight` counts matches per pair that are still being played.
+        """
+        in_flight = in_flight or {}
+        rng = rng or random
+        if len(self.players) < 2:
+            raise ValueError("At least two players are needed to choose a pair")
+
+        best, best_value = [], -1.0
+        for i, a in enumerate(self.players):
+            for b in self.players[i + 1:]:
+                p = expected_score(self.elo[a], self.elo[b])
+                games = self.games(a, b) + in_flight.get(frozenset((a, b)), 0)
+                value = p * (1 - p) / math.sqrt(1 + games)
+                if value > best_value + 1e-12:
+                    best, best_value = [(a, b)], value
+                elif abs(value - best_value) <= 1e-12:
+                    best.append((a, b))
+        a, b = rng.choice(best)
+        # Randomize which version is shown first to the evaluator
+        return (a, b) if rng.random() < 0.5 else (b, a)
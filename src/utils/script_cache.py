@@ -0,0 +1,58 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Dict, Optional
+
+import diskcache
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_FIELDS = ("key_points", "script_essence", "enhanced_script")
+
+
+def make_script_key(pdf_hash: str, prompt_hashes: Dict[str, str], models: Dict[str, str], provider: str, summarizer_mode: str) -> str:
+    payload = json.dumps(
+        {"pdf": pdf_hash, "prompts": prompt_hashes, "models": models, "provider": provider, "summarizer_mode": summarizer_mode},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ScriptCache:
+    """
+    On-disk cache of generated podcast scripts.
+
+    An entry holds the key points, script essence and enhanced script produced
+    for one paper by one version of each role's prompt with a given set of
+    models. Evaluation tournaments draw the same (paper, prompt version) pairs
+    again and again, so each distinct script is only generated once.
+    """
+
+    def __init__(self, directory: str, size_limit: int = 256 * 1024 * 1024):
+        self._disk = diskcache.Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        entry = self._disk.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key: str, script: Dict[str, str]) -> None:
+        try:
+            self._disk.set(key, {field: script[field] for field in SCRIPT_FIELDS})
+        except Exception as e:
+            logger.warning(f"Could not persist podcast script {key[:12]}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._disk)}
+
+    def clear(self) -> None:
+        self._disk.clear()
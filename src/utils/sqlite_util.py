@@ -0,0 +1,22 @@
+import sqlite3
+import threading
+
+_local = threading.local()
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Returns the calling thread's connection to `db_path`, opening it on first
+    use. Connections run in WAL mode and autocommit (isolation_level=None), so
+    readers never block the writer and stores manage transactions explicitly.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        connections[db_path] = conn
+    return conn
@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_stage_key(stage: str, provider: str, model: str, temperature: float, prompt: str, input_text: str) -> str:
+    return hash_text(json.dumps([stage, provider, model, temperature, hash_text(prompt), hash_text(input_text)]))
+
+
+class StageCache:
+    """
+    Memoizes LLM stage outputs across pipelines.
+
+    Concurrent requests for the same key share a single computation: the first
+    caller runs it, the others wait for its result. Completed results are kept
+    in an LRU only when `keep` is true, which the workflow uses for
+    deterministic (temperature 0) stages; sampled stages are shared while in
+    flight but never replayed for later podcasts.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[str, str]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._async_in_flight: Dict[str, asyncio.Future] = {}
+
+    def get_or_compute(self, key: str, compute: Callable[[], str], keep: bool = True) -> str:
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if keep:
+                self._results[key] = result
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        future.set_result(result)
+        return result
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[str]], keep: bool = True) -> str:
+        """
+        Async counterpart of get_or_compute for stages awaited on the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+            future = self._async_in_flight.get(key)
+            owner = future is None or future.get_loop() is not loop
+            if owner:
+                future = loop.create_future()
+                self._async_in_flight[key] = future
+
+        if not owner:
+            return await asyncio.shield(future)
+
+        try:
+            result = await compute()
+        except BaseException as e:
+            with self._lock:
+                if self._async_in_flight.get(key) is future:
+                    del self._async_in_flight[key]
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark the exception as retrieved when nobody else was waiting
+                future.exception()
+            raise
+
+        with self._lock:
+            if self._async_in_flight.get(key) is future:
+                del self._async_in_flight[key]
+            if keep:
+                self._results[key] = result
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        future.set_result(result)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+
+
+stage_cache = StageCache()
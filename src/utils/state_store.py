@@ -0,0 +1,79 @@
+import gzip
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Optional
+
+
+class PodcastStateStore:
+    """
+    Stores podcast states with the paper text deduplicated.
+
+    The extracted paper (`main_text`) is written once, gzip-compressed, under
+    texts/<sha256>.txt.gz; each podcast_state_<timestamp>.json only holds a
+    reference to it next to the generated fields. Both podcasts of a
+    /create_podcasts call, and every simulation round on the same paper, share
+    one copy. Loading can be limited to the fields a caller needs, in which
+    case the paper text is not read at all.
+    """
+
+    def __init__(self, states_dir: str):
+        self.states_dir = states_dir
+        self.texts_dir = os.path.join(states_dir, "texts")
+
+    def _state_path(self, timestamp: str) -> str:
+        return os.path.join(self.states_dir, f"podcast_state_{timestamp}.json")
+
+    def _text_path(self, digest: str) -> str:
+        return os.path.join(self.texts_dir, f"{digest}.txt.gz")
+
+    def save_text(self, text: str) -> str:
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._text_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(self.texts_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(gzip.compress(data))
+            os.replace(tmp_path, path)
+        return digest
+
+    def load_text(self, digest: str) -> str:
+        with open(self._text_path(digest), "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8")
+
+    def save(self, timestamp: str, state: Dict[str, str]) -> str:
+        data = dict(state)
+        data["main_text_ref"] = self.save_text(data.pop("main_text"))
+
+        os.makedirs(self.states_dir, exist_ok=True)
+        path = self._state_path(timestamp)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        return path
+
+    def exists(self, timestamp: str) -> bool:
+        return os.path.exists(self._state_path(timestamp))
+
+    def load(self, timestamp: str, fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, str]]:
+        """
+        Returns the state saved under `timestamp` (None if there is none),
+        restricted to `fields` when given. States written before main_text was
+        deduplicated, which hold it inline, load the same way.
+        """
+        path = self._state_path(timestamp)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        fields = set(fields) if fields is not None else None
+        reference = data.pop("main_text_ref", None)
+        if reference is not None and (fields is None or "main_text" in fields):
+            data["main_text"] = self.load_text(reference)
+        if fields is not None:
+            data = {field: value for field, value in data.items() if field in fields}
+        return data
@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import shutil
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, Optional
+
+try:
+    from src.utils.sqlite_util import connect
+except ImportError:
+    from utils.sqlite_util import connect
+
+logger = logging.getLogger(__name__)
+
+
+class TaskStore(ABC):
+    """
+    Interface for podcast task storage.
+
+    A task is a JSON-serialisable dict with at least a "status" key. Large
+    results (audio files) are stored as blobs next to the task rather than
+    inside it, so reading a task stays cheap.
+    """
+
+    @abstractmethod
+    def create(self, task_id: str, task: Dict) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def set(self, task_id: str, task: Dict) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, task_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def save_blob(self, task_id: str, name: str, data: bytes) -> str:
+        ...
+
+    @abstractmethod
+    def open_blob(self, task_id: str, name: str) -> Iterator[BinaryIO]:
+        ...
+
+    @abstractmethod
+    def get_blob_path(self, task_id: str, name: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def evict_expired(self) -> int:
+        ...
+
+
+class SQLiteTaskStore(TaskStore):
+    """
+    Task store backed by a SQLite database and a blob directory on disk.
+
+    Every uvicorn worker opens the same database file, so any worker can answer
+    status and audio requests for a job started by another one. Tasks that have
+    not been updated for `ttl_seconds` are evicted together with their blobs.
+    Pass blob_dir=None for tasks that only carry status (no blobs are kept).
+    """
+
+    def __init__(self, db_path: str, blob_dir: Optional[str], ttl_seconds: int = 24 * 60 * 60, eviction_interval: int = 60):
+        self.db_path = db_path
+        self.blob_dir = blob_dir
+        self.ttl_seconds = ttl_seconds
+        self.eviction_interval = eviction_interval
+        self._last_eviction = 0.0
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        if blob_dir is not None:
+            os.makedirs(blob_dir, exist_ok=True)
+
+        with connect(self.db_path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_updated_at ON tasks (updated_at)")
+
+    def create(self, task_id: str, task: Dict) -> None:
+        self._maybe_evict()
+        now = time.time()
+        with connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT INTO tasks (task_id, status, data, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (task_id, task.get("status", "processing"), json.dumps(task), now, now),
+            )
+
+    def get(self, task_id: str) -> Optional[Dict]:
+        row = connect(self.db_path).execute(
+            "SELECT data, updated_at FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        data, updated_at = row
+        if time.time() - updated_at > self.ttl_seconds:
+            return None
+        return json.loads(data)
+
+    def set(self, task_id: str, task: Dict) -> None:
+        now = time.time()
+        with connect(self.db_path) as conn:
+            conn.execute(
+                """
+                INSERT INTO tasks (task_id, status, data, created_at, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(task_id) DO UPDATE SET status = excluded.status, data = excluded.data, updated_at = excluded.updated_at
+                """,
+                (task_id, task.get("status", "processing"), json.dumps(task), now, now),
+            )
+
+    def delete(self, task_id: str) -> None:
+        with connect(self.db_path) as conn:
+            conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+        self._delete_blobs(task_id)
+
+    def _task_blob_dir(self, task_id: str) -> str:
+        return os.path.join(self.blob_dir, task_id)
+
+    def _delete_blobs(self, task_id: str) -> None:
+        if self.blob_dir is not None:
+            shutil.rmtree(self._task_blob_dir(task_id), ignore_errors=True)
+
+    def save_blob(self, task_id: str, name: str, data: bytes) -> str:
+        with self.open_blob(task_id, name) as f:
+            f.write(data)
+        return self.get_blob_path(task_id, name)
+
+    @contextmanager
+    def open_blob(self, task_id: str, name: str) -> Iterator[BinaryIO]:
+        """
+        Yields a file to write a blob into incrementally. The blob appears
+        under its name only once the block exits without an error.
+        """
+        if self.blob_dir is None:
+            raise ValueError("This task store was created without a blob directory")
+        task_dir = self._task_blob_dir(task_id)
+        os.makedirs(task_dir, exist_ok=True)
+        path = os.path.join(task_dir, name)
+        # Write to a temporary file first so readers never see a partial blob
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w+b") as f:
+                yield f
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+
+    def get_blob_path(self, task_id: str, name: str) -> Optional[str]:
+        if self.blob_dir is None:
+            return None
+        path = os.path.join(self._task_blob_dir(task_id), os.path.basename(name))
+        return path if os.path.exists(path) else None
+
+    def _maybe_evict(self) -> None:
+        if time.time() - self._last_eviction < self.eviction_interval:
+            return
+        try:
+            self.evict_expired()
+        except Exception as e:
+            logger.warning(f"Task eviction failed: {e}")
+
+    def evict_expired(self) -> int:
+        self._last_eviction = time.time()
+        cutoff = self._last_eviction - self.ttl_seconds
+        conn = connect(self.db_path)
+        expired = [row[0] for row in conn.execute("SELECT task_id FROM tasks WHERE updated_at < ?", (cutoff,))]
+        if not expired:
+            return 0
+
+        with conn:
+            conn.executemany("DELETE FROM tasks WHERE task_id = ?", [(task_id,) for task_id in expired])
+        for task_id in expired:
+            self._delete_blobs(task_id)
+
+        logger.info(f"Evicted {len(expired)} expired tasks")
+        return len(expired)
@@ -1,15 +1,20 @@
 import textgrad as tg
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable
 try:
-    from src.utils.utils import load_prompt, load_podcast_state, format_text_with_line_breaks, PROJECT_ROOT
+    from src.utils.utils import load_prompt, load_podcast_state, format_text_with_line_breaks, prompt_index, PROJECT_ROOT
     from src.utils.agents_and_workflows import WeightClippingAgent
 except ImportError:
-    from utils.utils import load_prompt, load_podcast_state, format_text_with_line_breaks, PROJECT_ROOT
+    from utils.utils import load_prompt, load_podcast_state, format_text_with_line_breaks, prompt_index, PROJECT_ROOT
     from utils.agents_and_workflows import WeightClippingAgent
 
+PROMPT_ROLES = ("summarizer", "scriptwriter", "enhancer")
+
 def optimize_prompt(role, old_timestamp, new_timestamp, engine_model, backward_engine):
-    # Set the backward engine
-    tg.set_backward_engine(backward_engine, override=True)
+    # Each call gets its own backward engine instead of tg.set_backward_engine,
+    # which is process-global and would be shared by concurrent optimizations
+    backward_llm = tg.get_engine(backward_engine, override=True)
     print(f"TextGrad backward engine set for {role}: {backward_engine}")
 
     # Determine the json_key based on the role
@@ -35,7 +40,7 @@ def optimize_prompt(role, old_timestamp, new_timestamp, engine_model, backward_e
     model = tg.BlackboxLLM(llm_engine, system_prompt=system_prompt)
 
     # Load the podcast state using the new timestamp
-    data = load_podcast_state(new_timestamp)
+    data = load_podcast_state(new_timestamp, fields=[json_key, "feedback"])
 
     if data is None:
         print(f"No podcast state found for timestamp: {new_timestamp}. Continuing without feedback.")
@@ -60,10 +65,10 @@ def optimize_prompt(role, old_timestamp, new_timestamp, engine_model, backward_e
                   role_description=f"target output for {role}")
 
     # Define the loss function
-    loss_fn = tg.TextLoss(target)
+    loss_fn = tg.TextLoss(target, engine=backward_llm)
 
     # Set up the optimizer
-    optimizer = tg.TGD(parameters=list(model.parameters()))
+    optimizer = tg.TGD(parameters=list(model.parameters()), engine=backward_llm)
 
     # Optimization loop
    
@@ -74,7 +79,7 @@ def optimize_prompt(role, old_timestamp, new_timestamp, engine_model, backward_e
     loss = loss_fn(output)
     
     # Backward pass
-    loss.backward()
+    loss.backward(engine=backward_llm)
     
     # Update the system prompt
     optimizer.step()
@@ -93,6 +98,24 @@ def optimize_prompt(role, old_timestamp, new_timestamp, engine_model, backward_e
     formatted_prompt = format_text_with_line_breaks(cleaned_prompt)
     with open(new_history_file, "w") as f:
         f.write(formatted_prompt)
+    prompt_index.record(role, new_timestamp, os.path.basename(new_history_file), formatted_prompt, parent=old_timestamp)
     print(f"\nOptimized, cleaned, and formatted system prompt for {role} saved to '{new_history_file}'")
 
     return cleaned_prompt
+
+def optimize_prompts(old_timestamp, new_timestamp, engine_model, backward_engine, roles: Iterable[str] = PROMPT_ROLES) -> Dict[str, str]:
+    """
+    Optimizes the prompts of several roles concurrently, one thread per role.
+
+    The roles are independent (each reads its own input from the podcast state
+    and writes its own history file), so a feedback round takes about as long
+    as the slowest role. Returns {role: cleaned prompt}; if any role fails, the
+    first error is raised once all of them have finished.
+    """
+    roles = list(roles)
+    with ThreadPoolExecutor(max_workers=len(roles)) as executor:
+        futures = {
+            role: executor.submit(optimize_prompt, role, old_timestamp, new_timestamp, engine_model, backward_engine)
+            for role in roles
+        }
+    return {role: future.result() for role, future in futures.items()}
@@ -0,0 +1,68 @@
+import re
+from typing import List
+
+import tiktoken
+
+# Lines that look like section headings in extracted paper text, e.g.
+# "Abstract", "1 Introduction", "3.2 Experimental Setup", "REFERENCES"
+_SECTION_HEADING = re.compile(
+    r"^(?:(?:\d+(?:\.\d+)*\.?|[IVX]+\.)\s+[A-Z][^\n]{0,80}"
+    r"|(?:Abstract|Introduction|Related Work|Background|Method(?:s|ology)?|Experiments?|Results"
+    r"|Discussion|Conclusions?|References|Bibliography|Appendix[^\n]{0,40}|Acknowledg(?:e)?ments))\s*$",
+    re.MULTILINE | re.IGNORECASE,
+)
+
+
+def get_encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text))
+
+
+def split_sections(text: str) -> List[str]:
+    starts = [match.start() for match in _SECTION_HEADING.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    return [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)]) if text[start:end].strip()]
+
+
+def _split_by_tokens(text: str, max_tokens: int) -> List[str]:
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+def split_text_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Splits a paper into chunks of at most `max_tokens` tokens.
+
+    Chunks follow section boundaries where possible: consecutive sections are
+    packed together until the next one would overflow the budget. A single
+    section that is too large on its own is split on paragraph boundaries and,
+    as a last resort, on raw token boundaries.
+    """
+    pieces = []
+    for section in split_sections(text):
+        if count_tokens(section) <= max_tokens:
+            pieces.append(section)
+            continue
+        for paragraph in re.split(r"\n\s*\n", section):
+            if count_tokens(paragraph) <= max_tokens:
+                pieces.append(paragraph + "\n\n")
+            else:
+                pieces.extend(_split_by_tokens(paragraph, max_tokens))
+
+    chunks = []
+    current, current_tokens = "", 0
+    for piece in pieces:
+        piece_tokens = count_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = "", 0
+        current += piece
+        current_tokens += piece_tokens
+    if current.strip():
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,66 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+from typing import Dict, Optional
+
+import diskcache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_tts_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TTSSegmentCache:
+    """
+    Disk-backed, size-bounded LRU cache of synthesized MP3 segments.
+
+    Segments are keyed by a hash of (voice, TTS model, normalized text), so
+    stock phrases and lines repeated when a paper is regenerated are only
+    synthesized once. Hit and miss counters are kept per process.
+    """
+
+    def __init__(self, directory: str, size_limit: int = 1024 * 1024 * 1024):
+        self._cache = diskcache.Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(voice: str, model: str, text: str) -> str:
+        return hashlib.sha256(json.dumps([voice, model, normalize_tts_text(text)]).encode("utf-8")).hexdigest()
+
+    def get(self, voice: str, model: str, text: str) -> Optional[bytes]:
+        try:
+            audio = self._cache.get(self.make_key(voice, model, text))
+        except Exception as e:
+            logger.warning(f"TTS cache read failed: {e}")
+            audio = None
+
+        with self._lock:
+            if audio is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return audio
+
+    def set(self, voice: str, model: str, text: str, audio: bytes) -> None:
+        try:
+            self._cache.set(self.make_key(voice, model, text), audio)
+        except Exception as e:
+            logger.warning(f"TTS cache write failed: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": len(self._cache),
+            "size_bytes": self._cache.volume(),
+        }
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from typing import Deque
+
+import openai
+
+try:
+    from src.utils.client_pool import get_async_openai_client
+except ImportError:
+    from utils.client_pool import get_async_openai_client
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """
+    Async token bucket: allows `rate` acquisitions per second with bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class TTSScheduler:
+    """
+    Process-wide scheduler for OpenAI text-to-speech calls.
+
+    All podcasts share one pooled AsyncOpenAI client, a global concurrency limit and a
+    token-bucket rate limit. When every slot is busy, freed slots are handed
+    to the waiting jobs (podcasts) in round-robin order, one request per job
+    per turn, so a job that arrives behind two long scripts gets the next free
+    slot instead of waiting for their whole backlog. Rate-limit and transient errors are retried with exponential
+    backoff and full jitter, honouring `Retry-After` when the API sends it.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_minute: float = 100,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._loop = None
+
+    def _bind_loop(self) -> None:
+        # asyncio primitives and the httpx client belong to one event loop;
+        # scripts that call asyncio.run() repeatedly get fresh ones per loop.
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._client = get_async_openai_client(max_retries=0)
+        self._bucket = TokenBucket(self.requests_per_minute / 60, max(1, self.max_concurrency))
+        self._active = 0
+        # job id -> requests waiting for a slot; the order of the jobs is the rotation
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    async def _acquire_slot(self, job_id: str) -> None:
+        waiter = self._loop.create_future()
+        self._waiting.setdefault(job_id, deque()).append(waiter)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled
+                self._release_slot()
+            else:
+                self._forget_waiter(job_id, waiter)
+            raise
+
+    def _forget_waiter(self, job_id: str, waiter: asyncio.Future) -> None:
+        waiters = self._waiting.get(job_id)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._waiting[job_id]
+
+    def _release_slot(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_concurrency and self._waiting:
+            # Serve the job at the head of the rotation, then move it to the back
+            job_id, waiters = next(iter(self._waiting.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                self._waiting.move_to_end(job_id)
+            else:
+                del self._waiting[job_id]
+            if not waiter.done():
+                waiter.set_result(None)
+                self._active += 1
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(self.max_delay, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def synthesize(self, text: str, voice: str = "onyx", model: str = "tts-1", job_id: str = "default") -> bytes:
+        self._bind_loop()
+        await self._acquire_slot(job_id)
+        try:
+            return await self._synthesize_with_retries(text, voice, model)
+        finally:
+            self._release_slot()
+
+    async def _synthesize_with_retries(self, text: str, voice: str, model: str) -> bytes:
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            try:
+                response = await self._client.audio.speech.create(model=model, voice=voice, input=text)
+                return response.content
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt, e)
+                attempt += 1
+                logger.warning(f"TTS call failed ({type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+tts_scheduler = TTSScheduler(
+    max_concurrency=int(os.getenv("TTS_MAX_CONCURRENCY", 8)),
+    requests_per_minute=float(os.getenv("TTS_REQUESTS_PER_MINUTE", 100)),
+)
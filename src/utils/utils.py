@@ -1,19 +1,36 @@
 import os
 import re
-from datetime import datetime
-import PyPDF2
 import markdown
 import random
-import json
-import io
+import asyncio
+import hashlib
 import logging
-from typing import List, Tuple, Optional
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Optional
 try:
-    from src.utils.agents_and_workflows import PodcastCreationWorkflow, PodcastState
+    from src.utils.agents_and_workflows import PodcastCreationWorkflow, PodcastState, SINGLE_PASS_TOKEN_LIMIT
+    from src.utils.pdf_cache import PdfTextCache, pdf_digest
+    from src.utils.pdf_extraction import PdfExtractionEngine
+    from src.utils.progress import report_progress
+    from src.utils.text_chunking import count_tokens
+    from src.utils.prompt_store import prompt_index, prompt_cache
+    from src.utils.script_cache import ScriptCache, make_script_key, SCRIPT_FIELDS
+    from src.utils.stage_cache import hash_text
+    from src.utils.event_log import EventLog
+    from src.utils.state_store import PodcastStateStore
 except ImportError:
-    from utils.agents_and_workflows import PodcastCreationWorkflow, PodcastState
+    from utils.agents_and_workflows import PodcastCreationWorkflow, PodcastState, SINGLE_PASS_TOKEN_LIMIT
+    from utils.pdf_cache import PdfTextCache, pdf_digest
+    from utils.pdf_extraction import PdfExtractionEngine
+    from utils.progress import report_progress
+    from utils.text_chunking import count_tokens
+    from utils.prompt_store import prompt_index, prompt_cache
+    from utils.script_cache import ScriptCache, make_script_key, SCRIPT_FIELDS
+    from utils.stage_cache import hash_text
+    from utils.event_log import EventLog
+    from utils.state_store import PodcastStateStore
 from langchain_core.messages import HumanMessage
-import tiktoken
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -25,74 +42,68 @@ def get_project_root():
 
 PROJECT_ROOT = get_project_root()
 
+# Papers above SINGLE_PASS_TOKEN_LIMIT can only be summarized in map-reduce mode,
+# which still refuses anything above MAX_PDF_TOKENS.
+MAX_PDF_TOKENS = 400000
+
+# Extracted text is keyed by the SHA-256 of the PDF bytes, so the same upload
+# (or the same paper across evaluation rounds) is only parsed once.
+pdf_text_cache = PdfTextCache(os.path.join(PROJECT_ROOT, "pdf_cache"))
+pdf_extraction_engine = PdfExtractionEngine()
+
+# Generated scripts keyed by paper, per-role prompt version and models, so
+# repeated (paper, prompt version) pairs in evaluation runs are only written once.
+# Only callers that pass use_script_cache=True to create_podcast use it.
+script_cache = ScriptCache(os.path.join(PROJECT_ROOT, "script_cache"))
+
+# Experiment ideas, feedback and votes are appended here as one JSON line each
+event_log = EventLog(os.path.join(PROJECT_ROOT, "events", "events.jsonl"))
+
+# Podcast states reference a single compressed copy of each paper's text
+podcast_state_store = PodcastStateStore(os.path.join(PROJECT_ROOT, "podcast_states"))
+
 def get_all_timestamps():
-    prompt_history_dir = os.path.join(PROJECT_ROOT, "prompt_history")
-    if not os.path.exists(prompt_history_dir):
-        print(f"Directory '{prompt_history_dir}' does not exist.")
-        return []
-    
-    print(f"Searching for timestamps in '{prompt_history_dir}'...")
-    
-    timestamps = set()
-    for filename in os.listdir(prompt_history_dir):
-        match = re.search(r'(\d{8}_\d{6})', filename)
-        if match:
-            try:
-                timestamp_str = match.group(1)
-                datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                timestamps.add(timestamp_str)
-            except ValueError:
-                print(f"Warning: Invalid timestamp format in file '{filename}'")
-    
-    sorted_timestamps = sorted(list(timestamps))
-    print(f"Found {len(sorted_timestamps)} unique timestamps.")
-    return sorted_timestamps
+    timestamps = prompt_index.all_timestamps()
+    print(f"Found {len(timestamps)} unique timestamps.")
+    return timestamps
 
 def get_last_timestamp():
-    timestamps = get_all_timestamps()
-    if not timestamps:
+    last_timestamp = prompt_index.latest()
+    if last_timestamp is None:
         print("No timestamps found. Using default prompts.")
         return None
-    last_timestamp = timestamps[-1]
     print(f"Using last timestamp: {last_timestamp}")
     return last_timestamp
 
 
 def load_prompt(role, timestamp=None):
-    prompt_file = f"{role}_prompt.txt"
-    prompts_dir = os.path.join(PROJECT_ROOT, "prompts")
-    
-    if timestamp:
-        prompt_history_dir = os.path.join(PROJECT_ROOT, "prompt_history")
-        os.makedirs(prompt_history_dir, exist_ok=True)  # Ensure the directory exists
-        history_file = f"{role}_prompt_{timestamp}.txt"
-        history_path = os.path.join(prompt_history_dir, history_file)
-        
-        if os.path.exists(history_path):
-            print(f"Loading prompt for {role} from history: {history_path}")
-            with open(history_path, 'r') as file:
-                return file.read().strip()
-        else:
-            print(f"No history found for {role} with timestamp {timestamp}")
-    
-    # If no timestamp provided or file not found, fall back to the original prompt file
-    prompt_path = os.path.join(prompts_dir, prompt_file)
-    print(f"Loading original prompt for {role} from: {prompt_path}")
-    with open(prompt_path, 'r') as file:
-        return file.read().strip()
-
-def load_podcast_state(timestamp):
-    state_file = f"podcast_state_{timestamp}.json"
-    podcast_states_dir = os.path.join(PROJECT_ROOT, "podcast_states")
-    state_file_path = os.path.join(podcast_states_dir, state_file)
-    if os.path.exists(state_file_path):
-        print(f"Loading podcast state from: {state_file_path}")
-        with open(state_file_path, 'r') as f:
-            return json.load(f)
+    # Prompt texts are served from memory and only re-read when the file changes
+    prompt_path = prompt_cache.resolve(role, timestamp)
+    if os.path.dirname(prompt_path) == prompt_index.history_dir:
+        print(f"Loading prompt for {role} from history: {prompt_path}")
     else:
+        if timestamp:
+            print(f"No history found for {role} with timestamp {timestamp}")
+        print(f"Loading original prompt for {role} from: {prompt_path}")
+    return prompt_cache.read(prompt_path)
+
+def load_podcast_state(timestamp, fields=None):
+    """
+    Loads the podcast state saved under `timestamp`. Pass `fields` (e.g.
+    ["key_points", "feedback"]) to read only those; the paper text is then
+    not loaded unless "main_text" is among them.
+    """
+    data = podcast_state_store.load(timestamp, fields)
+    if data is None:
         print(f"No podcast state found for timestamp: {timestamp}")
-        print(f"Searched in: {state_file_path}")
+        print(f"Searched in: {podcast_state_store.states_dir}")
         return None
+    print(f"Loading podcast state for timestamp: {timestamp}")
+    if fields is None or "feedback" in fields:
+        feedback_event = event_log.latest("feedback", timestamp)
+        if feedback_event is not None:
+            data["feedback"] = feedback_event["feedback"]
+    return data
 
 def format_text_with_line_breaks(text, words_per_line=15):
     words = text.split()
@@ -104,9 +115,14 @@ def format_text_with_line_breaks(text, words_per_line=15):
 
 
 def extract_text_from_pdf(pdf_content: bytes) -> Tuple[Optional[str], int]:
+    digest = pdf_digest(pdf_content)
+    cached = pdf_text_cache.get(digest)
+    if cached is not None:
+        logger.info(f"Using cached PDF text for {digest[:12]}")
+        return cached
+
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-        text = "".join(page.extract_text() for page in pdf_reader.pages)
+        text = pdf_extraction_engine.extract(pdf_content)
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
         return None, 0
@@ -114,13 +130,60 @@ def extract_text_from_pdf(pdf_content: bytes) -> Tuple[Optional[str], int]:
     if not text.strip():
         return None, 0
     
-    # Count tokens
-    encoding = tiktoken.get_encoding("cl100k_base")
-    tokens = encoding.encode(text)
-    token_count = len(tokens)
+    token_count = count_tokens(text)
+
+    pdf_text_cache.set(digest, text, token_count)
     
     return text, token_count
 
+# PDF digest -> extraction task, so concurrent callers parse one upload once
+_pdf_extractions: Dict[str, asyncio.Task] = {}
+
+async def extract_text_from_pdf_async(pdf_content: bytes) -> Tuple[Optional[str], int]:
+    """
+    Same as extract_text_from_pdf, but never blocks the event loop: parsing runs
+    in a worker thread or, for large documents, across the extraction process pool.
+    Callers that ask for the same PDF while it is being looked up or parsed
+    share one extraction.
+    """
+    digest = await asyncio.to_thread(pdf_digest, pdf_content)
+    task = _pdf_extractions.get(digest)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(_extract_and_cache(digest, pdf_content))
+        _pdf_extractions[digest] = task
+
+        def forget(done: asyncio.Task) -> None:
+            if _pdf_extractions.get(digest) is done:
+                del _pdf_extractions[digest]
+
+        task.add_done_callback(forget)
+    else:
+        logger.info(f"Waiting for the extraction of {digest[:12]} already in progress")
+    # Shielded so that a cancelled caller does not cancel the others' extraction
+    return await asyncio.shield(task)
+
+async def _extract_and_cache(digest: str, pdf_content: bytes) -> Tuple[Optional[str], int]:
+    # The text cache is backed by diskcache, so lookups and stores run off the event loop
+    cached = await asyncio.to_thread(pdf_text_cache.get, digest)
+    if cached is not None:
+        logger.info(f"Using cached PDF text for {digest[:12]}")
+        return cached
+
+    try:
+        text = await pdf_extraction_engine.extract_async(pdf_content)
+    except Exception as e:
+        print(f"Error extracting text from PDF: {e}")
+        return None, 0
+
+    if not text.strip():
+        return None, 0
+
+    token_count = await asyncio.to_thread(count_tokens, text)
+
+    await asyncio.to_thread(pdf_text_cache.set, digest, text, token_count)
+
+    return text, token_count
+
 def pdf_to_markdown(pdf_path: str) -> None:
     text = extract_text_from_pdf(pdf_path)
     md = markdown.markdown(text)
@@ -144,8 +207,6 @@ def get_random_arxiv_file():
     return os.path.join(arxiv_folder, random.choice(pdf_files))
 
 def save_podcast_state(state: PodcastState, timestamp: str):
-    filename = f"podcast_state_{timestamp}.json"
-    
     data = {
         "main_text": state["main_text"].content,
         "key_points": state["key_points"].content,
@@ -153,36 +214,15 @@ def save_podcast_state(state: PodcastState, timestamp: str):
         "enhanced_script": state["enhanced_script"].content
     }
     
-    podcast_states_dir = os.path.join(PROJECT_ROOT, "podcast_states")
-    
-    os.makedirs(podcast_states_dir, exist_ok=True)
-    filepath = os.path.join(podcast_states_dir, filename)
-    
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
+    filepath = podcast_state_store.save(timestamp, data)
     
     print(f"Podcast state saved to {filepath}")
 
 def add_feedback_to_state(timestamp: str, feedback: str):
-    filename = f"podcast_state_{timestamp}.json"
-    
-    podcast_states_dir = os.path.join(PROJECT_ROOT, "podcast_states")
-    
-    filepath = os.path.join(podcast_states_dir, filename)
-    
-    if not os.path.exists(filepath):
-        print(f"Error: Podcast state file {filepath} not found.")
-        return
-    
-    with open(filepath, 'r') as f:
-        data = json.load(f)
-    
-    data["feedback"] = feedback
-    
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
-    
-    print(f"Feedback added to {filepath}")
+    # Appended to the event log instead of rewriting the state file;
+    # load_podcast_state merges the latest feedback back in.
+    event_log.log("feedback", key=timestamp, timestamp=timestamp, feedback=feedback)
+    print(f"Feedback recorded for timestamp {timestamp}")
 
 def parse_dialogue(text: str) -> List[str]:
     pattern = r'(Host:|Guest:)'
@@ -192,27 +232,109 @@ def parse_dialogue(text: str) -> List[str]:
         dialogue_pieces.append(f"{pieces[i].strip()} {pieces[i+1].strip()}")
     return dialogue_pieces
 
-async def create_podcast(pdf_content: bytes, timestamp: str = None, summarizer_model: str = "openai/gpt-4o-mini", scriptwriter_model: str = "openai/gpt-4o-mini", enhancer_model: str = "openai/gpt-4o-mini", provider: str = "OpenRouter", api_key: str = None) -> Tuple[Optional[PodcastState], str]:
+class DialogueStreamParser:
+    """
+    Incremental counterpart of parse_dialogue for a script that arrives token by token.
+
+    feed() returns the Host:/Guest: turns completed by the new text, i.e. every
+    turn followed by the start of another one; finish() returns the last turn.
+    Together they yield the same pieces parse_dialogue gives for the full text.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        markers = list(re.finditer(r'(Host:|Guest:)', self._buffer))
+        if len(markers) < 2:
+            return []
+
+        completed = parse_dialogue(self._buffer[:markers[-1].start()])
+        self._buffer = self._buffer[markers[-1].start():]
+        return completed
+
+    def finish(self) -> List[str]:
+        remaining = parse_dialogue(self._buffer)
+        self._buffer = ""
+        return remaining
+
+PROMPT_ROLES = ("summarizer", "scriptwriter", "enhancer")
+
+# event loop -> {workflow configuration: compiled graph}. Chat models hold the
+# loop's async connection pool, so compiled graphs are only reused within a loop.
+_compiled_workflows = weakref.WeakKeyDictionary()
+MAX_COMPILED_WORKFLOWS = 32
+
+def get_compiled_workflow(summarizer_model, scriptwriter_model, enhancer_model, timestamp=None, provider="OpenRouter", api_key=None, summarizer_mode="auto"):
+    """
+    Returns a compiled podcast graph for the given models and prompt version,
+    building it only the first time a configuration is seen.
+    """
+    prompts = [prompt_cache.load(role, timestamp) for role in PROMPT_ROLES]
+    key = (summarizer_model, scriptwriter_model, enhancer_model, provider, api_key, summarizer_mode,
+           hashlib.sha256("\0".join(prompts).encode("utf-8")).hexdigest())
+
+    workflows = _compiled_workflows.setdefault(asyncio.get_running_loop(), OrderedDict())
+    if key in workflows:
+        workflows.move_to_end(key)
+        return workflows[key]
+
+    # If api_key is None, don't pass it to PodcastCreationWorkflow
+    workflow_obj = PodcastCreationWorkflow(summarizer_model, scriptwriter_model, enhancer_model, timestamp, provider, api_key, summarizer_mode=summarizer_mode) if api_key else PodcastCreationWorkflow(summarizer_model, scriptwriter_model, enhancer_model, timestamp, provider, summarizer_mode=summarizer_mode)
+    workflows[key] = workflow_obj.create_workflow().compile()
+    while len(workflows) > MAX_COMPILED_WORKFLOWS:
+        workflows.popitem(last=False)
+    return workflows[key]
+
+async def create_podcast(pdf_content: bytes, timestamp: str = None, summarizer_model: str = "openai/gpt-4o-mini", scriptwriter_model: str = "openai/gpt-4o-mini", enhancer_model: str = "openai/gpt-4o-mini", provider: str = "OpenRouter", api_key: str = None, progress_callback=None, summarizer_mode: str = "auto", enhancer_token_callback=None, use_script_cache: bool = False) -> Tuple[Optional[PodcastState], str]:
+    """
+    Runs the podcast workflow on a PDF. With use_script_cache=True a script
+    already generated for the same paper, prompts and models is reused; only
+    evaluation runs opt in, since the sampled enhancer output is otherwise
+    expected to differ from one upload to the next.
+    """
     logger.info(f"Creating podcast with timestamp: {timestamp}")
-    text, token_count = extract_text_from_pdf(pdf_content)
+    text, token_count = await extract_text_from_pdf_async(pdf_content)
 
     if text is None:
         logger.error("Error extracting text from PDF")
         return None, "Error extracting text from PDF"
 
-    if token_count > 40000:
-        logger.error(f"PDF content exceeds 40,000 tokens (current: {token_count})")
-        return None, f"PDF content exceeds 40,000 tokens (current: {token_count})"
+    token_limit = SINGLE_PASS_TOKEN_LIMIT if summarizer_mode == "single" else MAX_PDF_TOKENS
+    if token_count > token_limit:
+        logger.error(f"PDF content exceeds {token_limit:,} tokens (current: {token_count})")
+        return None, f"PDF content exceeds {token_limit:,} tokens (current: {token_count})"
 
     if not text.strip():
         logger.error("Extracted text is empty")
         return None, "Extracted text is empty"
 
+    report_progress(progress_callback, "pdf_parsed", token_count=token_count)
+
+    script_key = cached_script = None
+    if use_script_cache:
+        script_key = make_script_key(
+            pdf_digest(pdf_content),
+            {role: hash_text(prompt_cache.load(role, timestamp)) for role in PROMPT_ROLES},
+            {"summarizer": summarizer_model, "scriptwriter": scriptwriter_model, "enhancer": enhancer_model},
+            provider,
+            summarizer_mode,
+        )
+        cached_script = await asyncio.to_thread(script_cache.get, script_key)
+    if cached_script is not None:
+        logger.info(f"Using cached podcast script {script_key[:12]}")
+        report_progress(progress_callback, "script_cached")
+        if enhancer_token_callback is not None:
+            enhancer_token_callback(cached_script["enhanced_script"])
+        return PodcastState(
+            main_text=HumanMessage(content=text),
+            **{field: HumanMessage(content=cached_script[field]) for field in SCRIPT_FIELDS}), "Success"
+
     logger.info(f"Creating PodcastCreationWorkflow with models: {summarizer_model}, {scriptwriter_model}, {enhancer_model}")
-    # If api_key is None, don't pass it to PodcastCreationWorkflow
-    workflow_obj = PodcastCreationWorkflow(summarizer_model, scriptwriter_model, enhancer_model, timestamp, provider, api_key) if api_key else PodcastCreationWorkflow(summarizer_model, scriptwriter_model, enhancer_model, timestamp, provider)
-    workflow = workflow_obj.create_workflow()
-    workflow = workflow.compile()
+    workflow = get_compiled_workflow(summarizer_model, scriptwriter_model, enhancer_model, timestamp, provider, api_key, summarizer_mode)
+    # Per-request hooks travel in the run config so the compiled graph can be shared
+    config = {"configurable": {"progress_callback": progress_callback, "enhancer_token_callback": enhancer_token_callback}}
 
     state = PodcastState(
         main_text=HumanMessage(content=text),
@@ -222,8 +344,10 @@ async def create_podcast(pdf_content: bytes, timestamp: str = None, summarizer_m
 
     try:
         logger.info("Invoking workflow")
-        final_state = await workflow.ainvoke(state)
+        final_state = await workflow.ainvoke(state, config=config)
         logger.info("Workflow completed successfully")
+        if use_script_cache:
+            await asyncio.to_thread(script_cache.set, script_key, {field: final_state[field].content for field in SCRIPT_FIELDS})
         return final_state, "Success"
     except Exception as e:
         logger.error(f"Error creating podcast: {str(e)}", exc_info=True)
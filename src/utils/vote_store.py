@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+try:
+    from src.utils.sqlite_util import connect
+except ImportError:
+    from utils.sqlite_util import connect
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteVoteStore:
+    """
+    Vote storage backed by SQLite in WAL mode.
+
+    Every vote is one row with its metadata (the task it came from, the
+    podcast type and the pair of prompt versions that was shown), and the
+    per-version totals are kept in a separate table that is incremented in
+    the same transaction. A vote is therefore a single atomic write whose
+    cost does not depend on how many votes came before, and concurrent
+    requests or uvicorn workers never lose one.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        with connect(self.db_path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS votes (
+                    vote_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    task_id TEXT,
+                    podcast_type TEXT,
+                    shown TEXT,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS vote_totals (
+                    timestamp TEXT PRIMARY KEY,
+                    votes INTEGER NOT NULL
+                )
+                """
+            )
+
+    def record_vote(self, timestamp: str, task_id: Optional[str] = None, podcast_type: Optional[str] = None, shown: Optional[List[str]] = None) -> int:
+        """
+        Records one vote for `timestamp` and returns its new total.
+        """
+        conn = connect(self.db_path)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO votes (timestamp, task_id, podcast_type, shown, created_at) VALUES (?, ?, ?, ?, ?)",
+                (timestamp, task_id, podcast_type, json.dumps(shown) if shown else None, time.time()),
+            )
+            conn.execute(
+                """
+                INSERT INTO vote_totals (timestamp, votes) VALUES (?, 1)
+                ON CONFLICT(timestamp) DO UPDATE SET votes = votes + 1
+                """,
+                (timestamp,),
+            )
+            total = conn.execute("SELECT votes FROM vote_totals WHERE timestamp = ?", (timestamp,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return total
+
+    def totals(self) -> Dict[str, int]:
+        return dict(connect(self.db_path).execute("SELECT timestamp, votes FROM vote_totals").fetchall())
+
+    def iter_votes(self, since_id: int = 0) -> Iterator[Dict]:
+        """
+        Yields the votes after `since_id` in order, e.g. to feed pairwise
+        results (the voted version against the other one shown) to a rating model.
+        """
+        rows = connect(self.db_path).execute(
+            "SELECT vote_id, timestamp, task_id, podcast_type, shown, created_at FROM votes WHERE vote_id > ? ORDER BY vote_id",
+            (since_id,),
+        )
+        for vote_id, timestamp, task_id, podcast_type, shown, created_at in rows:
+            yield {
+                "vote_id": vote_id,
+                "timestamp": timestamp,
+                "task_id": task_id,
+                "podcast_type": podcast_type,
+                "shown": json.loads(shown) if shown else None,
+                "created_at": created_at,
+            }
+
+    def import_totals(self, json_path: str) -> None:
+        """
+        Imports the totals of a legacy votes.json file once, when the store is
+        still empty. Those votes have no metadata, so only the totals are kept.
+        """
+        if not os.path.exists(json_path):
+            return
+        with open(json_path, "r") as f:
+            content = f.read().strip()
+        if not content:
+            return
+
+        conn = connect(self.db_path)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT COUNT(*) FROM vote_totals").fetchone()[0] == 0:
+                conn.executemany(
+                    "INSERT INTO vote_totals (timestamp, votes) VALUES (?, ?)",
+                    json.loads(content).items(),
+                )
+                logger.info(f"Imported vote totals from {json_path}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
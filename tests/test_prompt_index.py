@@ -0,0 +1,22 @@
+import threading
+
+from src.utils.prompt_index import PromptIndex
+
+
+def test_record_on_empty_history_dir(tmp_path):
+    index = PromptIndex(str(tmp_path / "prompt_history"))
+
+    # record() used to deadlock here: rebuilding the missing manifest took the
+    # file lock a second time while record() already held it
+    worker = threading.Thread(
+        target=index.record,
+        args=("summarizer", "20241001_072128", "summarizer_prompt_20241001_072128.txt", "Summarize."),
+        daemon=True,
+    )
+    worker.start()
+    worker.join(timeout=5)
+    assert not worker.is_alive(), "PromptIndex.record() did not return"
+
+    assert index.latest() == "20241001_072128"
+    assert index.get("summarizer", "20241001_072128")["file"] == "summarizer_prompt_20241001_072128.txt"
+    assert PromptIndex(str(tmp_path / "prompt_history")).all_timestamps() == ["20241001_072128"]